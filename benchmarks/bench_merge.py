@@ -0,0 +1,81 @@
+"""
+Master Data 병합(merge_master_frames) 벤치마크.
+
+    python benchmarks/bench_merge.py
+
+기존 시트(티커 x 날짜 컬럼)와 이번 회차 수집분(일부 티커 + 새 분기)을 합성해
+크기별 병합 시간을 측정합니다.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from master_merge import merge_master_frames  # noqa: E402
+
+
+def quarter_dates(n):
+    """최신 분기부터 과거로 n개의 분기말 날짜 문자열"""
+    ends = pd.date_range(end='2025-12-31', periods=n, freq='QE')[::-1]
+    return [d.strftime('%Y-%m-%d') for d in ends]
+
+
+def make_old_frame(n_tickers, n_date_cols, seed=0):
+    """시트에서 읽은 것과 같은 형태(object, 빈 값은 '')의 기존 데이터"""
+    rng = np.random.default_rng(seed)
+    dates = quarter_dates(n_date_cols // 2 + 1)[1:]
+    cols = [f'{p}_{d}' for d in dates for p in ('Rev', 'EPS')][:n_date_cols]
+    values = rng.random((n_tickers, len(cols))) * 1e9
+    values[rng.random(values.shape) < 0.1] = 0
+    df = pd.DataFrame(values, columns=cols).astype(object)
+    df[rng.random(df.shape) < 0.1] = ''
+    df.insert(0, 'Last_Updated', '2026-01-01 00:00:00')
+    df['Error_Log'] = ''
+    df['Fail_Count'] = ''
+    df['Next_Retry'] = ''
+    df.index = pd.Index([f'T{i:05d}' for i in range(n_tickers)], name='Ticker')
+    return df
+
+
+def make_new_frame(n_tickers, n_updated, seed=1):
+    """이번 회차 수집분: 최신 분기 + 직전 3개 분기"""
+    rng = np.random.default_rng(seed)
+    dates = quarter_dates(4)
+    rows = []
+    for i in rng.choice(n_tickers, size=n_updated, replace=False):
+        row = {'Ticker': f'T{i:05d}', 'Last_Updated': '2026-02-01 00:00:00', 'Error_Log': ''}
+        for d in dates:
+            row[f'Rev_{d}'] = float(rng.random() * 1e9)
+            row[f'EPS_{d}'] = float(rng.random() * 10)
+        rows.append(row)
+    return pd.DataFrame(rows).set_index('Ticker')
+
+
+def run(sizes, n_updated=300, repeat=3):
+    results = []
+    for n_tickers, n_date_cols in sizes:
+        df_old = make_old_frame(n_tickers, n_date_cols)
+        df_new = make_new_frame(n_tickers, min(n_updated, n_tickers))
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            merge_master_frames(df_old, df_new)
+            timings.append(time.perf_counter() - start)
+        results.append({
+            'tickers': n_tickers,
+            'date_columns': n_date_cols,
+            'cells': n_tickers * n_date_cols,
+            'best_seconds': round(min(timings), 4),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    sizes = [(100, 20), (1000, 50), (1000, 200), (10000, 50), (10000, 200)]
+    print(f"{'tickers':>8} {'date_cols':>10} {'cells':>10} {'seconds':>9}")
+    for r in run(sizes):
+        print(f"{r['tickers']:>8} {r['date_columns']:>10} {r['cells']:>10} {r['best_seconds']:>9.4f}")
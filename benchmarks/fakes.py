@@ -0,0 +1,306 @@
+"""
+벤치마크용 오프라인 대체 구현 (yfinance.Ticker / gspread 클라이언트·시트).
+
+- FakeTicker: 합성 quarterly_financials를 반환, 요청 지연과 Rate Limit(429)을 흉내냄
+- FakeWorksheet: 메모리 그리드 위에서 gspread Worksheet의 사용 메서드를 구현,
+  호출 종류/횟수와 기록한 셀 수를 집계하고 호출마다 지연을 흉내냄
+  ('='로 시작하는 셀은 Ticker List 체크섬 수식으로 보고, 수식이 가리키는 시트 A열의 체크섬으로 계산)
+"""
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+from gspread.exceptions import APIError
+from gspread.utils import a1_to_rowcol
+
+MASTER_GID = 1101703314
+TICKER_LIST_GID = 0
+
+
+def quarter_ends(n, end='2025-12-31'):
+    """최신 분기부터 과거로 n개의 분기말 Timestamp"""
+    return list(pd.date_range(end=end, periods=n, freq='QE')[::-1])
+
+
+def make_statement(n_quarters=5, seed=0):
+    """yfinance quarterly_financials와 같은 모양(Index: 항목명, Columns: 날짜)의 프레임"""
+    rng = np.random.default_rng(seed)
+    rows = ['Total Revenue', 'Operating Revenue', 'Net Income', 'Operating Income',
+            'Diluted EPS', 'Basic EPS', 'Gross Profit', 'EBITDA', 'Tax Provision']
+    values = rng.random((len(rows), n_quarters)) * 1e9
+    frame = pd.DataFrame(values, index=rows, columns=quarter_ends(n_quarters))
+    frame.loc[['Diluted EPS', 'Basic EPS']] /= 1e8
+    return frame
+
+
+class RateLimitSimulator:
+    """window 초 동안 max_requests를 넘으면 429를 발생시킵니다. (max_requests=0이면 제한 없음)"""
+
+    def __init__(self, max_requests=0, window=1.0):
+        self.max_requests = max_requests
+        self.window = window
+        self._times = []
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def check(self):
+        if not self.max_requests:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._times = [t for t in self._times if now - t < self.window]
+            if len(self._times) >= self.max_requests:
+                self.rejected += 1
+                raise Exception("429 Client Error: Too Many Requests")
+            self._times.append(now)
+
+
+class FakeTickerFactory:
+    """yf.Ticker 대체: FakeTickerFactory(...)를 yf.Ticker 자리에 넣어 사용"""
+
+    def __init__(self, latency=0.0, n_quarters=5, empty_ratio=0.0, rate_limit=None):
+        self.latency = latency
+        self.n_quarters = n_quarters
+        self.empty_ratio = empty_ratio
+        self.rate_limit = rate_limit or RateLimitSimulator()
+        self.requests = 0
+        self._statement = make_statement(n_quarters)
+
+    def __call__(self, symbol, session=None):
+        return FakeTicker(self, symbol)
+
+
+class FakeTicker:
+    def __init__(self, factory, symbol):
+        self._factory = factory
+        self.ticker = symbol
+
+    def _request(self):
+        factory = self._factory
+        factory.requests += 1
+        if factory.latency:
+            time.sleep(factory.latency)
+        factory.rate_limit.check()
+
+    @property
+    def quarterly_financials(self):
+        self._request()
+        factory = self._factory
+        if factory.empty_ratio and (zlib.crc32(self.ticker.encode()) % 1000) / 1000 < factory.empty_ratio:
+            return pd.DataFrame()
+        return factory._statement.copy()
+
+    @property
+    def financials(self):
+        """연간 재무제표 (분기 프레임과 같은 항목, 연말 날짜 4개)"""
+        self._request()
+        statement = self._factory._statement.iloc[:, :4].copy()
+        statement.columns = list(pd.date_range(end='2025-12-31', periods=4, freq='YE')[::-1])
+        return statement
+
+    @property
+    def calendar(self):
+        self._request()
+        return {'Earnings Date': [pd.Timestamp('2026-01-29').date()]}
+
+
+class FakeWorksheet:
+    """gspread Worksheet 대체 (메모리 그리드)"""
+
+    def __init__(self, grid, id=MASTER_GID, title='Sheet', latency=0.0, row_count=None):
+        self.grid = [list(r) for r in grid]
+        self.id = id
+        self.title = title
+        self.latency = latency
+        self._row_count = row_count or max(1000, len(self.grid))
+        self._col_count = max(26, max((len(r) for r in self.grid), default=0))
+        self.calls = {}
+        self.cells_written = 0
+        # 수식 셀 계산에 사용 (FakeSpreadsheet가 설정)
+        self.spreadsheet = None
+
+    def _call(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def row_count(self):
+        return self._row_count
+
+    @property
+    def col_count(self):
+        return self._col_count
+
+    def _values(self):
+        width = max((len(r) for r in self.grid), default=0)
+        grid = [r + [''] * (width - len(r)) for r in self.grid]
+        while grid and all(v == '' for v in grid[-1]):
+            grid.pop()
+        return grid
+
+    def _evaluate(self, value):
+        # 수식 셀(ticker_signature_formula)은 참조한 시트 A열의 "개수:CRC32"로 대신 계산 (실제 수식 검증 아님)
+        if not (isinstance(value, str) and value.startswith('=')) or self.spreadsheet is None:
+            return value
+        for worksheet in self.spreadsheet._worksheets:
+            if f"'{worksheet.title}'!" in value:
+                column = [str(r[0]) for r in worksheet.grid if r and r[0] != '']
+                return f"{len(column)}:{zlib.crc32(chr(10).join(column).encode())}"
+        return '#REF!'
+
+    def get_values(self, range_name=None, **kwargs):
+        self._call('get_values')
+        return [[self._evaluate(v) for v in r] for r in self._values()]
+
+    get_all_values = get_values
+
+    def col_values(self, col, **kwargs):
+        self._call('col_values')
+        return [r[col - 1] for r in self.grid if len(r) >= col and r[col - 1] != '']
+
+    def batch_get(self, ranges, **kwargs):
+        self._call('batch_get')
+        grid = self._values()
+        result = []
+        for r in ranges:
+            if r == '1:1':
+                result.append([grid[0]] if grid else [])
+            elif r == 'A:A':
+                result.append([[row[0]] if row and row[0] != '' else [] for row in grid])
+            else:
+                raise NotImplementedError(r)
+        return result
+
+    def insert_cols(self, values, col=1, **kwargs):
+        self._call('insert_cols')
+        for i, row in enumerate(self.grid):
+            for j, column in enumerate(values):
+                row.insert(col - 1 + j, column[i] if i < len(column) else '')
+        self._col_count += len(values)
+        self.cells_written += sum(len(c) for c in values)
+
+    def delete_columns(self, start_index, end_index=None):
+        self._call('delete_columns')
+        end_index = end_index or start_index
+        for row in self.grid:
+            del row[start_index - 1:end_index]
+
+    def add_rows(self, rows):
+        self._call('add_rows')
+        self._row_count += rows
+
+    def add_cols(self, cols):
+        self._call('add_cols')
+        self._col_count += cols
+
+    def batch_update(self, data, **kwargs):
+        self._call('batch_update')
+        for item in data:
+            start, _, end = item['range'].partition(':')
+            r1, c1 = a1_to_rowcol(start)
+            for i, row_values in enumerate(item['values']):
+                r = r1 - 1 + i
+                while len(self.grid) <= r:
+                    self.grid.append([])
+                row = self.grid[r]
+                for j, value in enumerate(row_values):
+                    c = c1 - 1 + j
+                    while len(row) <= c:
+                        row.append('')
+                    row[c] = value
+                self.cells_written += len(row_values)
+
+    def clear(self):
+        self._call('clear')
+        self.grid = []
+
+    def update(self, values, *args, **kwargs):
+        self._call('update')
+        self.grid = [list(r) for r in values]
+        self.cells_written += sum(len(r) for r in values)
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheets, latency=0.0):
+        self._worksheets = worksheets
+        self.latency = latency
+        self.metadata_calls = 0
+        for worksheet in worksheets:
+            worksheet.spreadsheet = self
+
+    def worksheets(self):
+        self.metadata_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return list(self._worksheets)
+
+    def add_worksheet(self, title, rows=1000, cols=26):
+        if any(ws.title == title for ws in self._worksheets):
+            raise APIError(FakeResponse(400, f'A sheet with the name "{title}" already exists.'))
+        worksheet = FakeWorksheet([], id=max((w.id for w in self._worksheets), default=0) + 1,
+                                  title=title, latency=self.latency, row_count=rows)
+        worksheet.spreadsheet = self
+        self._worksheets.append(worksheet)
+        return worksheet
+
+
+class FakeResponse:
+    """gspread APIError에 넣을 HTTP 응답 대체"""
+
+    def __init__(self, code, message):
+        self.status_code = code
+        self.text = message
+        self._body = {'error': {'code': code, 'message': message, 'status': 'INVALID_ARGUMENT'}}
+
+    def json(self):
+        return self._body
+
+
+class FakeGspreadClient:
+    """SheetsClient(client=...)에 넣는 gspread 클라이언트 대체"""
+
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+
+    def open_by_key(self, key):
+        return self.spreadsheet
+
+
+def make_master_grid(n_tickers, n_date_columns, seed=0):
+    """Master Data 시트 그리드 (헤더 + 행). 값의 약 10%는 빈 칸/0"""
+    rng = np.random.default_rng(seed)
+    dates = [d.strftime('%Y-%m-%d') for d in quarter_ends(n_date_columns // 2 + 2)[1:]]
+    cols = [f'{p}_{d}' for d in dates for p in ('Rev', 'EPS')][:n_date_columns]
+    header = ['Ticker', 'Last_Updated'] + cols + ['Error_Log', 'Fail_Count', 'Next_Retry']
+    values = rng.random((n_tickers, len(cols))) * 1e9
+    values[rng.random(values.shape) < 0.05] = 0
+    blanks = rng.random(values.shape) < 0.05
+    base = pd.Timestamp('2026-01-01')
+    grid = [header]
+    for i in range(n_tickers):
+        row = [f'T{i:05d}', (base + pd.Timedelta(minutes=int(rng.integers(0, 60 * 24 * 30)))).strftime('%Y-%m-%d %H:%M:%S')]
+        row += ['' if blanks[i, j] else float(values[i, j]) for j in range(len(cols))]
+        row += ['', '', '']
+        grid.append(row)
+    return grid
+
+
+def make_ticker_grid(n_tickers, n_new=0):
+    """Ticker List 시트 그리드: 기존 n_tickers개 + 신규 n_new개"""
+    return [['Ticker']] + [[f'T{i:05d}'] for i in range(n_tickers + n_new)]
+
+
+def make_sheets_client(n_tickers, n_date_columns, n_new=0, latency=0.0):
+    """가짜 시트 두 장(Ticker List, Master Data)을 가진 SheetsClient"""
+    from sheets_client import SheetsClient
+
+    master = FakeWorksheet(make_master_grid(n_tickers, n_date_columns), id=MASTER_GID,
+                           title='Master Data', latency=latency)
+    ticker_list = FakeWorksheet(make_ticker_grid(n_tickers, n_new), id=TICKER_LIST_GID,
+                                title='Ticker List', latency=latency)
+    spreadsheet = FakeSpreadsheet([ticker_list, master], latency=latency)
+    client = SheetsClient(spreadsheet_id='benchmark', client=FakeGspreadClient(spreadsheet))
+    return client, master, ticker_list
@@ -0,0 +1,180 @@
+"""
+오프라인 파이프라인 벤치마크.
+
+    python benchmarks/run_benchmarks.py                     # 전체 (100 / 1k / 10k 티커)
+    python benchmarks/run_benchmarks.py --quick             # 빠른 확인용 (100 / 1k)
+    python benchmarks/run_benchmarks.py --baseline old.json # 이전 결과 대비 회귀 검사
+
+yf.Ticker와 gspread 시트를 benchmarks/fakes.py의 대체 구현으로 바꿔서
+get_target_tickers, get_financials(추출), FetchEngine, update_master_data를 측정하고
+결과를 JSON 리포트로 저장합니다. --baseline이 주어지면 기준보다 느려진 항목이 있을 때
+종료 코드 1을 반환합니다.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fakes  # noqa: E402
+import yfinance_client  # noqa: E402
+from fetch_engine import FetchEngine, make_row  # noqa: E402
+from main import get_target_tickers  # noqa: E402
+from yfinance_client import YFinanceClient  # noqa: E402
+
+UPDATED_PER_RUN = 300
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_target_selection(n_tickers, n_date_columns):
+    client, master, _ = fakes.make_sheets_client(n_tickers, n_date_columns, n_new=n_tickers // 100)
+    all_tickers, read_tickers = timed(client.get_all_tickers, gid=fakes.TICKER_LIST_GID)
+    master_df, read_master = timed(client.get_master_data)
+    targets, select = timed(get_target_tickers, all_tickers, master_df, limit=UPDATED_PER_RUN,
+                            earnings_dates={})
+    return {
+        'seconds': read_tickers + read_master + select,
+        'read_tickers_seconds': read_tickers,
+        'read_master_seconds': read_master,
+        'select_seconds': select,
+        'targets': len(targets),
+    }
+
+
+def bench_extraction(n_tickers, n_quarters):
+    factory = fakes.FakeTickerFactory(n_quarters=n_quarters)
+    client = YFinanceClient(metrics=['Rev', 'EPS', 'NI', 'OpInc'])
+    with mock.patch('yfinance.Ticker', factory):
+        start = time.perf_counter()
+        for i in range(n_tickers):
+            client.get_financials(f'T{i:05d}')
+        elapsed = time.perf_counter() - start
+    return {'seconds': elapsed, 'per_ticker_ms': elapsed / n_tickers * 1000}
+
+
+def bench_fetch_engine(n_tickers, workers, latency, rate):
+    factory = fakes.FakeTickerFactory(latency=latency,
+                                      rate_limit=fakes.RateLimitSimulator(max_requests=int(rate * 2), window=1.0))
+    engine = FetchEngine(YFinanceClient(), workers=workers, rate=rate, backoff_base=0.2, backoff_max=2.0)
+    with mock.patch('yfinance.Ticker', factory):
+        rows, elapsed = timed(engine.run, [f'T{i:05d}' for i in range(n_tickers)])
+    errors = sum(1 for row in rows if row['Error_Log'])
+    return {
+        'seconds': elapsed,
+        'tickers_per_second': n_tickers / elapsed,
+        'requests': factory.requests,
+        'rate_limited': factory.rate_limit.rejected,
+        'error_rows': errors,
+    }
+
+
+def bench_update_master(n_tickers, n_date_columns, mode):
+    client, master, _ = fakes.make_sheets_client(n_tickers, n_date_columns)
+    client.get_master_data()
+
+    # 이번 회차 수집분: 기존 티커 일부 + 새 분기 1개 (새 날짜 컬럼 추가 발생)
+    statement = fakes.make_statement(4)
+    statement.columns = fakes.quarter_ends(4, end='2026-03-31')
+    data = yfinance_client.extract_metrics(statement)
+    step = max(1, n_tickers // UPDATED_PER_RUN)
+    rows = [make_row(f'T{i:05d}', data) for i in range(0, n_tickers, step)][:UPDATED_PER_RUN]
+
+    master.calls.clear()
+    _, elapsed = timed(client.update_master_data, rows, mode=mode)
+    return {
+        'seconds': elapsed,
+        'api_calls': sum(master.calls.values()),
+        'calls': dict(master.calls),
+        'cells_written': master.cells_written,
+    }
+
+
+def run(sizes, date_columns, fetch_tickers):
+    results = []
+
+    def record(name, params, func, *args):
+        result = func(*args)
+        result['seconds'] = round(result['seconds'], 4)
+        results.append({'benchmark': name, 'params': params, **result})
+        print(f"{name:<20} {json.dumps(params):<45} {result['seconds']:>9.4f}s")
+
+    for n in sizes:
+        record('target_selection', {'tickers': n, 'date_columns': 40}, bench_target_selection, n, 40)
+    for n in sizes:
+        record('extraction', {'tickers': n, 'quarters': 5}, bench_extraction, n, 5)
+    for workers in (1, 4, 8):
+        params = {'tickers': fetch_tickers, 'workers': workers, 'latency': 0.05, 'rate': 50}
+        record('fetch_engine', params, bench_fetch_engine, fetch_tickers, workers, 0.05, 50)
+    for n in sizes:
+        for d in date_columns:
+            for mode in ('incremental', 'full'):
+                params = {'tickers': n, 'date_columns': d, 'mode': mode}
+                record('update_master_data', params, bench_update_master, n, d, mode)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """기준 대비 threshold배 이상 (그리고 50ms 이상) 느려진 항목 목록"""
+    base = {(r['benchmark'], json.dumps(r['params'], sort_keys=True)): r for r in baseline['results']}
+    regressions = []
+    for r in results:
+        old = base.get((r['benchmark'], json.dumps(r['params'], sort_keys=True)))
+        if old and r['seconds'] > old['seconds'] * threshold and r['seconds'] - old['seconds'] > 0.05:
+            regressions.append({'benchmark': r['benchmark'], 'params': r['params'],
+                                'baseline_seconds': old['seconds'], 'seconds': r['seconds']})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks")
+    parser.add_argument('--sizes', default='100,1000,10000', help="티커 수 목록 (쉼표 구분)")
+    parser.add_argument('--date-columns', default='20,100,200', help="날짜 컬럼 수 목록 (쉼표 구분)")
+    parser.add_argument('--fetch-tickers', type=int, default=100)
+    parser.add_argument('--quick', action='store_true', help="100 / 1k 티커, 날짜 컬럼 20 / 100만 측정")
+    parser.add_argument('--output', default='bench_report.json')
+    parser.add_argument('--baseline', help="비교할 이전 리포트(JSON)")
+    parser.add_argument('--threshold', type=float, default=1.5, help="회귀로 판단할 배수")
+    args = parser.parse_args()
+
+    sizes = [int(x) for x in args.sizes.split(',')]
+    date_columns = [int(x) for x in args.date_columns.split(',')]
+    if args.quick:
+        sizes = [n for n in sizes if n <= 1000]
+        date_columns = [d for d in date_columns if d <= 100]
+
+    results = run(sizes, date_columns, args.fetch_tickers)
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['regressions'] = compare(results, json.load(f), args.threshold)
+        for r in report['regressions']:
+            print(f"REGRESSION {r['benchmark']} {json.dumps(r['params'])}: "
+                  f"{r['baseline_seconds']:.4f}s -> {r['seconds']:.4f}s")
+        exit_code = 1 if report['regressions'] else 0
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import os
+import json
+import threading
+from datetime import datetime
+
+
+class ChangeFeed:
+    """
+    Master Data에 새로 채워진 값의 변경 기록 (append-only JSONL).
+    한 줄 = {"ts", "ticker", "period", "metric", "old", "new", "kind"}
+    - kind: 'new_quarter'(해당 티커에 그 분기 값이 없었음) | 'filled'(0이던 값이 채워짐)
+    소비자는 파일을 tail -F 하거나 마지막으로 읽은 바이트 위치부터 이어 읽으면 되므로
+    시트 전체를 다시 읽고 비교할 필요가 없습니다.
+    파일이 max_bytes를 넘으면 path.1, path.2, ... 로 밀어내고(최대 backups개 보관) 새 파일에 이어 씁니다.
+    (파일 크기가 마지막 위치보다 작아지면 소비자는 path.1의 나머지를 읽고 새 파일 처음부터 읽으면 됨)
+    """
+
+    def __init__(self, path=None, max_bytes=None, backups=None):
+        self.path = path or os.getenv("CHANGE_FEED_PATH", ".cache/changes.jsonl")
+        if max_bytes is None:
+            max_bytes = float(os.getenv("CHANGE_FEED_MAX_MB", "50")) * 1024 * 1024
+        self.max_bytes = int(max_bytes)
+        self.backups = int(backups if backups is not None else os.getenv("CHANGE_FEED_BACKUPS", "5"))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def append(self, changes, ts=None):
+        """changes: (ticker, metric, period, old, new) 목록. 기록한 줄 수를 반환합니다."""
+        if not changes:
+            return 0
+        ts = ts or datetime.now().isoformat(timespec='seconds')
+        lines = []
+        for ticker, metric, period, old, new in changes:
+            lines.append(json.dumps({
+                'ts': ts, 'ticker': ticker, 'period': period, 'metric': metric,
+                'old': old, 'new': new, 'kind': 'new_quarter' if old is None else 'filled',
+            }))
+        with self._lock:
+            self._rotate_if_full()
+            with open(self.path, 'a') as f:
+                f.write('\n'.join(lines) + '\n')
+        return len(lines)
+
+    def _rotate_if_full(self):
+        if not self.max_bytes or not os.path.exists(self.path) or os.path.getsize(self.path) < self.max_bytes:
+            return
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{i}'):
+                os.replace(f'{self.path}.{i}', f'{self.path}.{i + 1}')
+        os.replace(self.path, f'{self.path}.1')
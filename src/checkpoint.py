@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import logging
+import threading
+
+from instrumentation import stats
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """
+    수집했지만 아직 시트에 쓰지 못한 행을 보관하는 로컬 JSONL 파일.
+    행이 수집될 때마다 한 줄씩 추가하고, 시트에 기록되면 남은 행만으로 다시 씁니다.
+    실행이 중간에 죽으면 다음 실행이 이 파일의 행을 먼저 기록하고 해당 티커는 다시 받지 않습니다.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("CHECKPOINT_PATH", ".cache/checkpoint.jsonl")
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def load(self):
+        """남아 있는 행 목록 (같은 티커가 여러 번 있으면 마지막 것)"""
+        if not os.path.exists(self.path):
+            return []
+        rows = {}
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    # 쓰는 도중 죽어서 잘린 마지막 줄
+                    continue
+                rows[row['Ticker']] = row
+        return list(rows.values())
+
+    def append(self, row):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(row) + '\n')
+
+    def replace(self, rows):
+        """파일 내용을 rows로 교체합니다. (임시 파일 + rename으로 원자적 교체)"""
+        if not rows:
+            self.clear()
+            return
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            for row in rows:
+                f.write(json.dumps(row) + '\n')
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class ChunkedWriter:
+    """
+    수집 결과를 chunk_size개 또는 chunk_seconds초마다 시트에 나눠서 기록합니다.
+    - add(row)는 수집 워커 스레드에서 호출되며, 행은 즉시 체크포인트에 추가됩니다.
+    - 기록(write_fn)이 실패하면 행을 버퍼에 남겨 다음 기록 때 다시 시도합니다.
+    - budget(RunBudget)이 있으면, 마지막 기록 1회분의 쓰기 호출을 남겨둘 수 있을 때만 중간 기록을 합니다.
+    기록이 끝난 행은 메모리에서 버리므로 실행 전체 결과를 들고 있지 않습니다.
+    """
+
+    def __init__(self, write_fn, chunk_size=None, chunk_seconds=None, checkpoint=None, budget=None):
+        self.write_fn = write_fn
+        self.chunk_size = int(chunk_size if chunk_size is not None else os.getenv("WRITE_CHUNK_SIZE", "100"))
+        self.chunk_seconds = float(chunk_seconds if chunk_seconds is not None
+                                   else os.getenv("WRITE_CHUNK_SECONDS", "300"))
+        self.checkpoint = checkpoint
+        self.budget = budget
+        self.written = 0
+
+        self._buffer = checkpoint.load() if checkpoint is not None else []
+        # 중간 기록을 시도할 버퍼 크기 (실패하면 한 청크만큼 더 모은 뒤 재시도)
+        self._flush_at = self.chunk_size
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    @property
+    def pending(self):
+        """아직 시트에 기록되지 않은 행의 티커 목록"""
+        with self._lock:
+            return [row['Ticker'] for row in self._buffer]
+
+    def add(self, row):
+        with self._lock:
+            self._buffer.append(row)
+            if self.checkpoint is not None:
+                self.checkpoint.append(row)
+            due = (len(self._buffer) >= self._flush_at
+                   or time.monotonic() - self._last_flush >= self.chunk_seconds)
+        if due and (self.budget is None or self.budget.can_flush(reserved_flushes=1)):
+            self._flush(raise_errors=False)
+
+    def flush(self):
+        """남은 행을 모두 기록합니다. (실패 시 예외, 행은 체크포인트에 남음)"""
+        self._flush(raise_errors=True)
+
+    def _flush(self, raise_errors):
+        # 다른 워커가 기록 중이면 그 기록이 끝난 뒤의 다음 기회로 넘김 (수집은 계속 진행)
+        if not self._flush_lock.acquire(blocking=raise_errors):
+            return
+        try:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+                self._last_flush = time.monotonic()
+            if not rows:
+                return
+            try:
+                self.write_fn(rows)
+            except Exception as e:
+                with self._lock:
+                    self._buffer = rows + self._buffer
+                    self._flush_at = len(self._buffer) + self.chunk_size
+                stats.count('write.chunk_failures')
+                if raise_errors:
+                    raise
+                logger.error(f"Chunk write of {len(rows)} rows failed, will retry with the next chunk: {e}")
+                return
+
+            self.written += len(rows)
+            self._flush_at = self.chunk_size
+            stats.count('write.chunks')
+            logger.info(f"Wrote chunk of {len(rows)} rows ({self.written} so far).")
+            if self.checkpoint is not None:
+                with self._lock:
+                    self.checkpoint.replace(self._buffer)
+        finally:
+            self._flush_lock.release()
@@ -0,0 +1,313 @@
+import os
+import time
+import random
+import logging
+import threading
+from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from yfinance_client import is_rate_limit_error, is_transport_error, NETWORK_ERROR_PREFIX, NO_DATA_ERROR
+from instrumentation import stats
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def make_row(ticker, data=None, error=''):
+    """Master Data에 기록할 한 줄(dict)을 만듭니다."""
+    row = {
+        'Ticker': ticker,
+        'Last_Updated': datetime.now().strftime(TIMESTAMP_FORMAT),
+        'Error_Log': error
+    }
+    if data:
+        row.update(data)
+    return row
+
+
+class TokenBucket:
+    """
+    모든 워커가 공유하는 토큰 버킷 Rate Limiter.
+    429/빈 응답이 오면 속도를 줄이고(multiplicative decrease),
+    정상 응답이 이어지면 조금씩 원래 속도로 회복합니다(additive increase).
+    """
+
+    def __init__(self, rate, burst=1.0, min_rate=0.05):
+        self.base_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = min_rate
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """토큰 tokens개를 얻을 때까지 대기합니다. (요청 1건 = 토큰 1개)"""
+        start = time.perf_counter()
+        try:
+            for _ in range(tokens):
+                self._acquire()
+        finally:
+            stats.observe('fetch.rate_limit_wait_seconds', time.perf_counter() - start)
+
+    def _acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                    self._last = now
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        return
+                    wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def penalize(self, pause, factor=0.5):
+        """속도를 factor배로 줄이고, 모든 워커를 pause초 동안 멈춥니다."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * factor)
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            # 멈춘 동안에는 토큰이 쌓이지 않도록 (재개 직후 burst 방지)
+            self._tokens = 0.0
+            self._last = self._paused_until
+
+    def reward(self):
+        """정상 응답 1건마다 원래 속도 쪽으로 조금씩 회복합니다."""
+        with self._lock:
+            self.rate = min(self.base_rate, self.rate + self.base_rate * 0.05)
+
+
+class CircuitBreaker:
+    """
+    최근 window건의 요청 중 Yahoo 쪽 실패(429, 연결 실패/5xx) 비율이 threshold를 넘으면 차단기가 열립니다(trip).
+    빈 응답/기타 예외는 티커 문제(상장폐지 등)일 수 있으므로 세지 않습니다. (죽은 티커가 몰려 있어도 열리지 않도록)
+    열리면 호출부가 전체 워커를 cooldown초 멈추고, 한 실행에서 max_trips번 넘게 열리면
+    Yahoo 쪽 장애로 보고 남은 티커 수집을 중단합니다(halted).
+    """
+
+    def __init__(self, window=None, threshold=None, cooldown=None, max_trips=None):
+        self.window = int(window if window is not None else os.getenv("BREAKER_WINDOW", "20"))
+        self.threshold = float(threshold if threshold is not None else os.getenv("BREAKER_ERROR_RATE", "0.5"))
+        self.cooldown = float(cooldown if cooldown is not None else os.getenv("BREAKER_COOLDOWN_SEC", "120"))
+        self.max_trips = int(max_trips if max_trips is not None else os.getenv("BREAKER_MAX_TRIPS", "3"))
+        self.trips = 0
+        # degraded 판단에 필요한 최소 표본 수
+        self.min_samples = min(self.window, 5)
+        self._outcomes = deque(maxlen=self.window)
+        self._lock = threading.Lock()
+
+    @property
+    def halted(self):
+        return self.trips > self.max_trips
+
+    @property
+    def degraded(self):
+        """
+        지금 실패가 Yahoo 쪽 장애 때문일 가능성이 높은지 여부 (FailureTracker가 티커 실패로 세지 않도록)
+        - 최근 표본의 실패 비율이 threshold를 넘음
+        - 차단기가 열린 뒤 새 표본이 아직 min_samples개 모이지 않음
+        """
+        with self._lock:
+            n = len(self._outcomes)
+            if n < self.min_samples:
+                return self.trips > 0
+            return sum(self._outcomes) / n > self.threshold
+
+    def record(self, failed):
+        """요청 결과를 기록합니다. 이번 기록으로 차단기가 열렸으면 True"""
+        with self._lock:
+            self._outcomes.append(bool(failed))
+            if len(self._outcomes) < self.window or sum(self._outcomes) / self.window <= self.threshold:
+                return False
+            # 열릴 때마다 표본을 비워서, 멈춘 뒤 새 요청들로 다시 판단
+            self._outcomes.clear()
+            self.trips += 1
+            return True
+
+
+class FetchEngine:
+    """
+    공유 Rate Limiter 아래에서 여러 워커로 티커를 동시에 수집합니다.
+    - 429(Rate Limit): 지수 백오프 후 재시도, 전체 속도 감소
+    - 빈 DataFrame이 연속으로 나오면 차단 징후로 보고 속도 감소
+    - 에러 비율이 급증하면 서킷 브레이커로 전체 일시 정지, 반복되면 수집 중단
+    - 결과 행 포맷/에러 행은 기존 직렬 루프와 동일
+    """
+
+    def __init__(self, client, workers=4, rate=0.8, max_retries=3,
+                 backoff_base=5.0, backoff_max=120.0, empty_streak_threshold=3):
+        self.client = client
+        self.workers = max(1, int(workers))
+        self.bucket = TokenBucket(rate, burst=self.workers)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.empty_streak_threshold = empty_streak_threshold
+        self.breaker = CircuitBreaker()
+        # HedgedProvider: 보조 제공자 결과로 가려진 주 제공자(Yahoo) 에러도 감속/차단기에 반영
+        if hasattr(client, 'on_primary_error'):
+            client.on_primary_error = self._on_hidden_error
+
+        self._lock = threading.Lock()
+        self._empty_streak = 0
+        self._done = 0
+        self._total = 0
+
+    def _backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        # 워커들이 동시에 깨어나지 않도록 jitter 추가
+        return delay * (0.5 + random.random() / 2)
+
+    def _on_empty(self):
+        with self._lock:
+            self._empty_streak += 1
+            streak = self._empty_streak
+        if streak >= self.empty_streak_threshold:
+            logger.warning(f"{streak} empty responses in a row. Slowing down.")
+            stats.count('fetch.empty_backoffs')
+            self.bucket.penalize(self._backoff(0), factor=0.75)
+
+    def _on_success(self):
+        with self._lock:
+            self._empty_streak = 0
+        self.bucket.reward()
+
+    def _on_hidden_error(self, e):
+        if is_rate_limit_error(e):
+            logger.warning("Yahoo rate limited (answered by secondary provider). Backing off.")
+            stats.count('fetch.rate_limited')
+            self.bucket.penalize(self._backoff(0))
+            self._record(failed=True)
+        elif is_transport_error(e):
+            stats.count('fetch.network_errors')
+            self._record(failed=True)
+
+    def _record(self, failed):
+        if not self.breaker.record(failed):
+            return
+        stats.count('fetch.breaker_trips')
+        if self.breaker.halted:
+            logger.error(f"Error rate stayed above {self.breaker.threshold:.0%} after "
+                         f"{self.breaker.max_trips} pauses. Stopping fetch for this run.")
+        else:
+            logger.warning(f"Error rate above {self.breaker.threshold:.0%}. "
+                           f"Pausing all workers for {self.breaker.cooldown:.0f}s.")
+            self.bucket.penalize(self.breaker.cooldown)
+
+    def _progress(self, ticker):
+        with self._lock:
+            self._done += 1
+            done = self._done
+        logger.info(f"[{done}/{self._total}] Fetched {ticker}")
+
+    def fetch_one(self, ticker, budget=None, include_annual=False):
+        """티커 하나를 수집해 Master Data 행(dict)으로 반환합니다."""
+        stats.mark('first_fetch')
+        start = time.perf_counter()
+        try:
+            return self._fetch_one(ticker, include_annual)
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.observe('fetch.ticker_seconds', elapsed)
+            if budget is not None:
+                budget.observe_ticker(elapsed)
+
+    def _fetch_one(self, ticker, include_annual=False):
+        attempt = 0
+        while True:
+            # 이번 호출이 보낼 요청 수만큼 토큰을 받음 (캐시로 응답 가능하면 0, calendar 요청 등 포함)
+            cost = self.client.request_cost(ticker, include_annual=include_annual)
+            if attempt > 0:
+                cost = max(cost, 1)
+            if cost:
+                self.bucket.acquire(cost)
+            try:
+                if include_annual:
+                    data = self.client.get_financials(ticker, include_annual=True)
+                else:
+                    data = self.client.get_financials(ticker)
+            except Exception as e:
+                # HTTPError(429)도 OSError 하위 클래스이므로 Rate Limit을 먼저 판별
+                rate_limited = is_rate_limit_error(e)
+                transport = not rate_limited and is_transport_error(e)
+                self._record(failed=rate_limited or transport)
+                if rate_limited and attempt < self.max_retries:
+                    pause = self._backoff(attempt)
+                    logger.warning(f"Rate limited on {ticker}. Backing off {pause:.1f}s (retry {attempt + 1}/{self.max_retries}).")
+                    self.bucket.penalize(pause)
+                    stats.count('fetch.rate_limited')
+                    stats.count('fetch.retries')
+                    attempt += 1
+                    continue
+                if transport:
+                    # 연결 실패/5xx: 티커 문제가 아니므로 FailureTracker가 실패로 세지 않는 메시지로 기록
+                    logger.warning(f"Network error on {ticker}: {e}")
+                    stats.count('fetch.network_errors')
+                    self._progress(ticker)
+                    return make_row(ticker, error=f"{NETWORK_ERROR_PREFIX}: {str(e)}")
+                logger.error(f"Error processing {ticker}: {e}")
+                stats.count('fetch.errors')
+                self._progress(ticker)
+                return make_row(ticker, error=f"Exception: {str(e)}")
+
+            # 빈 응답은 티커 문제일 수 있으므로 차단기에는 성공으로 기록 (연속되면 _on_empty가 감속)
+            self._record(failed=False)
+            if data:
+                self._on_success()
+                row = make_row(ticker, data)
+            else:
+                self._on_empty()
+                stats.count('fetch.empty')
+                row = make_row(ticker, error=NO_DATA_ERROR)
+            self._progress(ticker)
+            return row
+
+    def run(self, tickers, budget=None, on_result=None, bulk=None):
+        """
+        티커 목록을 동시에 수집합니다. 결과는 입력 순서를 유지합니다.
+        워커들은 우선순위 순으로 다음 티커를 가져가며, budget(RunBudget).allows_next()가
+        False가 되거나 서킷 브레이커가 수집을 중단하면 멈추므로 앞쪽 일부만 수집될 수 있습니다.
+        on_result(row)가 주어지면 행이 수집될 때마다 (완료 순서대로) 호출하고 결과 목록은 모으지 않습니다.
+        bulk(티커 집합)에 속한 티커는 분기와 연간 재무제표를 함께 받습니다. (신규 티커 backfill)
+        """
+        self._total = len(tickers)
+        self._done = 0
+        if not tickers:
+            return [] if on_result is None else 0
+
+        queue = iter(enumerate(tickers))
+        queue_lock = threading.Lock()
+        results = {}
+
+        def worker():
+            while True:
+                with queue_lock:
+                    if self.breaker.halted or (budget is not None and not budget.allows_next()):
+                        return
+                    item = next(queue, None)
+                if item is None:
+                    return
+                i, ticker = item
+                row = self.fetch_one(ticker, budget, include_annual=bool(bulk) and ticker in bulk)
+                if on_result is not None:
+                    on_result(row)
+                    row = None
+                results[i] = row
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for future in [executor.submit(worker) for _ in range(self.workers)]:
+                future.result()
+
+        if len(results) < len(tickers):
+            reason = "Circuit breaker open" if self.breaker.halted else "Run budget reached"
+            logger.info(f"{reason}: fetched {len(results)} of {len(tickers)} queued tickers.")
+            stats.count('fetch.not_started', len(tickers) - len(results))
+        if on_result is not None:
+            return len(results)
+        return [results[i] for i in sorted(results)]
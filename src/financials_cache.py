@@ -0,0 +1,154 @@
+import os
+import io
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from scheduler import expected_report_date, report_due
+
+
+class FinancialsCache:
+    """
+    yfinance quarterly_financials 원본 프레임을 티커별로 저장하는 로컬 SQLite 캐시.
+
+    캐시를 그대로 사용하는 경우:
+    1. 수집한 지 ttl_hours가 지나지 않은 경우
+    2. 캐시된 최신 분기가 fresh_quarter_days 이내인 경우
+       (다음 분기 실적이 아직 발표될 수 없으므로 다시 받아도 같은 결과)
+       단, max_age_days가 지나면 정정 공시 반영을 위해 다시 받습니다.
+
+    단, 실적 발표 예정일이 지났는데 캐시에 새 분기가 없으면(스케줄러 점수 2.0 이상) 위 조건과 관계없이
+    발표 예정일 이전에 받은 항목은 쓰지 않고, 이후에 받은 항목도 due_ttl_hours 동안만 사용합니다.
+    (발표 후 몇 시간 안에 새 분기가 반영되도록)
+    """
+
+    def __init__(self, path=None, ttl_hours=None, fresh_quarter_days=None, max_age_days=None,
+                 calendar_ttl_days=None, due_ttl_hours=None):
+        self.path = path or os.getenv("YF_CACHE_PATH", ".cache/yfinance.sqlite")
+        self.ttl_hours = float(ttl_hours if ttl_hours is not None else os.getenv("YF_CACHE_TTL_HOURS", "24"))
+        self.fresh_quarter_days = int(fresh_quarter_days if fresh_quarter_days is not None
+                                      else os.getenv("YF_CACHE_FRESH_QUARTER_DAYS", "100"))
+        self.max_age_days = int(max_age_days if max_age_days is not None
+                                else os.getenv("YF_CACHE_MAX_AGE_DAYS", "30"))
+        self.calendar_ttl_days = float(calendar_ttl_days if calendar_ttl_days is not None
+                                       else os.getenv("YF_CALENDAR_TTL_DAYS", "7"))
+        self.due_ttl_hours = float(due_ttl_hours if due_ttl_hours is not None
+                                   else os.getenv("YF_CACHE_DUE_TTL_HOURS", "1"))
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS statements ("
+                " ticker TEXT PRIMARY KEY,"
+                " frame TEXT NOT NULL,"
+                " latest_quarter TEXT,"
+                " fetched_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS earnings_calendar ("
+                " ticker TEXT PRIMARY KEY,"
+                " earnings_date TEXT,"
+                " fetched_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, ticker):
+        """캐시 항목 (frame, fetched_at, latest_quarter, earnings_date)을 반환합니다. 없으면 None."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT s.frame, s.fetched_at, s.latest_quarter, c.earnings_date FROM statements s"
+                " LEFT JOIN earnings_calendar c ON c.ticker = s.ticker WHERE s.ticker = ?", (ticker,)
+            ).fetchone()
+        if row is None:
+            return None
+        frame = pd.read_json(io.StringIO(row[0]), orient='split')
+        frame.columns = pd.to_datetime(frame.columns)
+        return frame, row[1], row[2], row[3]
+
+    def is_fresh(self, fetched_at, latest_quarter, now=None, earnings_date=None):
+        now = now or time.time()
+        age_hours = (now - fetched_at) / 3600
+        expected = expected_report_date(latest_quarter, earnings_date)
+        if report_due(expected, datetime.fromtimestamp(now)):
+            # 새 분기 발표 예정일이 지났는데 캐시에는 아직 없음
+            return datetime.fromtimestamp(fetched_at) >= expected and age_hours < self.due_ttl_hours
+        if age_hours < self.ttl_hours:
+            return True
+        if age_hours >= self.max_age_days * 24 or not latest_quarter:
+            return False
+        quarter_age_days = (datetime.fromtimestamp(now) - datetime.strptime(latest_quarter, '%Y-%m-%d')).days
+        return quarter_age_days < self.fresh_quarter_days
+
+    def get_fresh(self, ticker):
+        """캐시가 유효하면 프레임을, 아니면 None을 반환합니다."""
+        entry = self.get(ticker)
+        if entry is None:
+            return None
+        frame, fetched_at, latest_quarter, earnings_date = entry
+        return frame if self.is_fresh(fetched_at, latest_quarter, earnings_date=earnings_date) else None
+
+    def has_fresh(self, ticker):
+        """프레임을 복원하지 않고 유효한 캐시가 있는지만 확인합니다."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT s.fetched_at, s.latest_quarter, c.earnings_date FROM statements s"
+                " LEFT JOIN earnings_calendar c ON c.ticker = s.ticker WHERE s.ticker = ?", (ticker,)
+            ).fetchone()
+        return row is not None and self.is_fresh(row[0], row[1], earnings_date=row[2])
+
+    def put(self, ticker, frame):
+        if frame is None or frame.empty:
+            return
+        latest_quarter = max(frame.columns).strftime('%Y-%m-%d')
+        payload = frame.to_json(orient='split', date_format='iso')
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO statements (ticker, frame, latest_quarter, fetched_at) VALUES (?, ?, ?, ?)",
+                (ticker, payload, latest_quarter, time.time())
+            )
+
+    def calendar_is_stale(self, ticker):
+        """실적 발표일 캐시가 없거나 calendar_ttl_days가 지났는지 여부"""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT fetched_at FROM earnings_calendar WHERE ticker = ?", (ticker,)
+            ).fetchone()
+        return row is None or time.time() - row[0] >= self.calendar_ttl_days * 86400
+
+    def put_earnings_date(self, ticker, earnings_date):
+        """earnings_date: 'YYYY-MM-DD' 또는 None(일정 없음)"""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO earnings_calendar (ticker, earnings_date, fetched_at) VALUES (?, ?, ?)",
+                (ticker, earnings_date, time.time())
+            )
+
+    def get_earnings_dates(self):
+        """캐시된 실적 발표일 전체 {ticker: 'YYYY-MM-DD'} (네트워크 요청 없음)"""
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT ticker, earnings_date FROM earnings_calendar WHERE earnings_date IS NOT NULL"
+            ).fetchall()
+        return dict(rows)
+
+    def evict(self):
+        """max_age_days가 지난 항목을 삭제하고 삭제한 개수를 반환합니다."""
+        cutoff = time.time() - self.max_age_days * 86400
+        with self._lock, self._connect() as conn:
+            deleted = conn.execute("DELETE FROM statements WHERE fetched_at < ?", (cutoff,)).rowcount
+        return deleted
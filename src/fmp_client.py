@@ -0,0 +1,112 @@
+import os
+import time
+import logging
+import threading
+
+import requests
+import pandas as pd
+
+from providers import FinancialsProvider
+from yfinance_client import DEFAULT_METRICS, METRIC_SPECS, is_rate_limit_error
+from instrumentation import stats
+
+logger = logging.getLogger(__name__)
+BASE_URL = "https://financialmodelingprep.com/stable/income-statement"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# METRIC_SPECS 키 -> FMP income-statement 필드 (우선순위 순)
+FMP_FIELDS = {
+    'Rev': ['revenue'],
+    'EPS': ['epsDiluted', 'epsdiluted', 'eps'],
+    'NI': ['netIncome'],
+    'OpInc': ['operatingIncome'],
+}
+
+
+class FMPClient(FinancialsProvider):
+    """
+    Financial Modeling Prep 분기 손익계산서 클라이언트 (보조 제공자).
+    YFinanceClient와 같은 {항목_YYYY-MM-DD: 값} 형태로 반환합니다.
+    무료 플랜은 하루 요청 수가 적으므로 수집 사이클당 max_requests회까지만 요청합니다. (start_cycle에서 초기화)
+    """
+    name = 'fmp'
+
+    def __init__(self, api_key=None, metrics=None, quarters=5, max_requests=None, timeout=10):
+        self.api_key = api_key or os.getenv("FMP_API_KEY")
+        if not self.api_key:
+            raise ValueError("FMP_API_KEY is not set.")
+        if metrics is None:
+            metrics = [m.strip() for m in os.getenv("METRICS", ",".join(DEFAULT_METRICS)).split(",") if m.strip()]
+        unsupported = [m for m in metrics if m not in FMP_FIELDS]
+        if unsupported:
+            raise ValueError(f"Metrics not available from FMP: {unsupported}")
+        self.metrics = metrics
+        self.quarters = quarters
+        self.max_requests = int(max_requests if max_requests is not None
+                                else os.getenv("FMP_MAX_REQUESTS_PER_RUN", "10"))
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        self._requests = 0
+        self._lock = threading.Lock()
+
+    def start_cycle(self):
+        with self._lock:
+            self._requests = 0
+
+    def _reserve_request(self):
+        with self._lock:
+            if self._requests >= self.max_requests:
+                return False
+            self._requests += 1
+            return True
+
+    def get_financials(self, ticker_symbol, include_annual=False):
+        # 연간 값은 요청 수 한도를 아끼기 위해 받지 않음 (include_annual 무시)
+        if not self._reserve_request():
+            stats.count('fmp.skipped_quota')
+            return None
+        start = time.perf_counter()
+        try:
+            response = self.session.get(BASE_URL, timeout=self.timeout, params={
+                'symbol': ticker_symbol, 'period': 'quarter', 'limit': self.quarters, 'apikey': self.api_key,
+            })
+            response.raise_for_status()
+            statements = response.json()
+        except Exception as e:
+            if is_rate_limit_error(e):
+                raise
+            logger.warning(f"Error fetching FMP data for {ticker_symbol}: {e}")
+            return None
+        finally:
+            stats.count('fmp.requests')
+            stats.observe('fmp.request_seconds', time.perf_counter() - start)
+
+        if not isinstance(statements, list) or not statements:
+            return None
+        return extract_fmp_metrics(statements, self.metrics)
+
+
+def extract_fmp_metrics(statements, metrics=DEFAULT_METRICS):
+    """
+    FMP income-statement 응답(분기별 dict 목록)을 {항목_YYYY-MM-DD: 값}으로 변환합니다.
+    FMP의 date는 실제 회계기간 종료일(예: 2025-09-27)이므로 Yahoo와 같은 컬럼에 들어가도록 월말로 맞춥니다.
+    """
+    result = {}
+    for statement in statements:
+        try:
+            period = (pd.Timestamp(statement['date']) + pd.offsets.MonthEnd(0)).strftime('%Y-%m-%d')
+        except (KeyError, ValueError):
+            continue
+        for name in metrics:
+            value = 0.0
+            for field in FMP_FIELDS[name]:
+                candidate = statement.get(field)
+                if candidate is None or (METRIC_SPECS[name]['skip_zero'] and candidate == 0):
+                    continue
+                value = float(candidate)
+                break
+            result[f'{name}_{period}'] = value
+    return result
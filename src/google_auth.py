@@ -0,0 +1,103 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+
+from instrumentation import stats
+
+logger = logging.getLogger(__name__)
+
+SCOPE = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive"
+]
+
+# connect_early()로 시작한 백그라운드 연결 (thread, 결과 dict)
+_early = None
+
+
+def authorize(credentials_path):
+    """서비스 계정 파일로 인증된 gspread 클라이언트를 만듭니다. (GOOGLE_TOKEN_CACHE=1이면 토큰 캐시 사용)"""
+    if not os.path.exists(credentials_path):
+        # JSON 내용을 환경변수에서 직접 읽는 로직은 복잡해지므로 일단 파일 경로 우선
+        # 실제 프로덕션(GitHub Actions)에서는 Secrets를 파일로 덤프해서 사용 예정
+        raise FileNotFoundError(f"Credentials file not found at: {credentials_path}")
+
+    import gspread
+    from google.oauth2.service_account import Credentials
+    creds = Credentials.from_service_account_file(credentials_path, scopes=SCOPE)
+    if os.getenv("GOOGLE_TOKEN_CACHE", "1") == "1":
+        _use_cached_token(creds, os.getenv("GOOGLE_TOKEN_CACHE_PATH", ".cache/google_token.json"))
+    return gspread.authorize(creds)
+
+
+def _use_cached_token(creds, path):
+    """
+    지난 실행에서 받은 OAuth 액세스 토큰이 아직 유효하면 재사용하고, 아니면 새로 받아 저장합니다.
+    (토큰 교환 왕복 1회 절약, 만료되면 google-auth가 실행 중 자동으로 갱신)
+    캐시는 서비스 계정과 scope가 같을 때만 사용합니다.
+    """
+    key = f"{creds.service_account_email}|{' '.join(SCOPE)}"
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+        if cached.get('key') == key:
+            creds.token = cached['token']
+            # google-auth는 expiry를 timezone 없는 UTC로 비교
+            creds.expiry = datetime.fromisoformat(cached['expiry'])
+    except (OSError, ValueError, KeyError):
+        pass
+    if creds.valid:
+        stats.count('sheets.token_cache_hits')
+        return
+
+    from google.auth.transport.requests import Request
+    creds.refresh(Request())
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # 토큰은 비밀 값이므로 소유자만 읽을 수 있게 저장
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'key': key, 'token': creds.token, 'expiry': creds.expiry.isoformat()}, f)
+
+
+def connect_early():
+    """
+    인증과 스프레드시트 열기(토큰 교환, 메타데이터 조회 = 네트워크 대기)를 백그라운드 스레드에서 시작합니다.
+    pandas/numpy 등 무거운 import보다 먼저 부르면 import와 네트워크 대기가 겹칩니다. (스크립트 실행 시작 시 1회)
+    """
+    global _early
+    spreadsheet_id = os.getenv("SPREADSHEET_ID")
+    if _early is not None or not spreadsheet_id:
+        return
+    result = {}
+
+    def connect():
+        try:
+            client = authorize(os.getenv("GOOGLE_SHEETS_CREDENTIALS_PATH", "credentials.json"))
+            result['connection'] = {'client': client, 'spreadsheet': client.open_by_key(spreadsheet_id)}
+        except Exception as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=connect, name='google-connect', daemon=True)
+    thread.start()
+    _early = (thread, spreadsheet_id, result)
+
+
+def early_connection(spreadsheet_id=None):
+    """
+    connect_early()의 결과 {'client', 'spreadsheet'} (SheetsClient 키워드 인자).
+    시작하지 않았거나 다른 스프레드시트이거나 실패했으면 빈 dict (SheetsClient가 직접 연결하며 에러도 거기서 발생)
+    """
+    if _early is None:
+        return {}
+    thread, early_id, result = _early
+    if spreadsheet_id and spreadsheet_id != early_id:
+        return {}
+    thread.join()
+    if 'error' in result:
+        logger.warning(f"Early Google connection failed, retrying: {result['error']}")
+        return {}
+    return result['connection']
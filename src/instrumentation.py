@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import cProfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+# 히스토그램 구간 상한 (초)
+HISTOGRAM_BUCKETS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60]
+
+
+class RunStats:
+    """
+    한 번의 실행 동안 단계별 소요 시간, 호출 횟수, 지연 분포를 모읍니다. (스레드 안전)
+    - stage(name): 구간 소요 시간 누적
+    - count(name, n): 카운터 (Sheets 읽기/쓰기 호출, 기록한 셀 수, 429/재시도 등)
+    - observe(name, value): 값 분포 (티커별 수집 지연 등)
+    - mark(name): 시작 후 처음 도달한 시각 (import 완료, 첫 수집 시작 등)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = datetime.now()
+            self._start = time.perf_counter()
+            self.stages = {}
+            self.counters = {}
+            self.samples = {}
+            self.marks = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value):
+        with self._lock:
+            self.samples.setdefault(name, []).append(value)
+
+    def mark(self, name):
+        """name 지점에 처음 도달한 시각(시작 후 초)을 기록합니다. 이후 호출은 무시"""
+        if name in self.marks:
+            return
+        with self._lock:
+            self.marks.setdefault(name, round(time.perf_counter() - self._start, 3))
+
+    def summary(self):
+        with self._lock:
+            return {
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'total_seconds': round(time.perf_counter() - self._start, 3),
+                'stages': {k: round(v, 3) for k, v in self.stages.items()},
+                'marks': dict(self.marks),
+                'counters': dict(self.counters),
+                'histograms': {k: _histogram(v) for k, v in self.samples.items()},
+            }
+
+    def write_summary(self, path=None):
+        """실행 요약을 JSON으로 저장합니다. (GitHub Actions artifact로 보관)"""
+        path = path or os.getenv("RUN_SUMMARY_PATH", "run_summary.json")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        summary = self.summary()
+        with open(path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+
+def _histogram(values):
+    values = sorted(values)
+    n = len(values)
+
+    def pct(p):
+        return round(values[min(n - 1, int(p * n))], 4)
+
+    buckets = {}
+    for upper in HISTOGRAM_BUCKETS + [float('inf')]:
+        label = f"le_{upper}" if upper != float('inf') else "le_inf"
+        buckets[label] = sum(1 for v in values if v <= upper)
+    return {
+        'count': n,
+        'sum': round(sum(values), 4),
+        'mean': round(sum(values) / n, 4),
+        'p50': pct(0.5),
+        'p90': pct(0.9),
+        'p99': pct(0.99),
+        'max': round(values[-1], 4),
+        'buckets': buckets,
+    }
+
+
+@contextmanager
+def profiled(path=None):
+    """PROFILE_OUTPUT(또는 path)가 설정되어 있으면 구간을 cProfile로 측정해 저장합니다."""
+    path = path or os.getenv("PROFILE_OUTPUT")
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+# 프로세스 전역 인스턴스 (main / SheetsClient / YFinanceClient / FetchEngine 공용)
+# main이 가장 먼저 import하므로 시작 시각은 프로세스 시작 직후 (cron 모드의 import 시간 포함)
+stats = RunStats()
@@ -0,0 +1,150 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from master_merge import FIXED_COLUMNS, to_numeric_frame
+from scheduler import QUARTER_DAYS
+
+# SQLite 변수 개수 제한을 넘지 않도록 IN (...) 조회를 나눠서 실행
+_CHUNK = 500
+
+
+def split_metric_column(col_name):
+    """'Rev_2025-12-31' -> ('Rev', '2025-12-31'). 날짜 컬럼이 아니면 None"""
+    if len(col_name) < 12 or col_name[-11] != '_' or col_name[-6] != '-':
+        return None
+    return col_name[:-11], col_name[-10:]
+
+
+def window_start(quarters, now=None):
+    """최근 quarters개 분기 창의 시작일('YYYY-MM-DD'). quarters가 0이면 None(제한 없음)"""
+    if not quarters:
+        return None
+    now = now or datetime.now()
+    return (now - timedelta(days=QUARTER_DAYS * int(quarters))).strftime('%Y-%m-%d')
+
+
+class LongStore:
+    """
+    (Ticker, Period, Metric, Value, Fetched_At) 형태의 로컬 SQLite 저장소.
+    수집 결과는 여기에 먼저 기록되고, Google Sheet(Master Data)는 이 저장소의
+    wide 형태 뷰(선택적으로 최근 N개 분기만)로 내보냅니다.
+    병합 규칙은 시트와 같습니다: 기존 값이 0/비어 있을 때만 새 값으로 갱신.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("LONG_STORE_PATH", ".cache/financials.sqlite")
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS observations ("
+                " ticker TEXT NOT NULL,"
+                " period TEXT NOT NULL,"
+                " metric TEXT NOT NULL,"
+                " value REAL,"
+                " fetched_at TEXT NOT NULL,"
+                " PRIMARY KEY (ticker, period, metric))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def is_empty(self):
+        with self._lock, self._connect() as conn:
+            return conn.execute("SELECT 1 FROM observations LIMIT 1").fetchone() is None
+
+    def _upsert(self, records, overwrite_empty=True):
+        if overwrite_empty:
+            sql = (
+                "INSERT INTO observations (ticker, period, metric, value, fetched_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (ticker, period, metric) DO UPDATE SET "
+                " value = excluded.value, fetched_at = excluded.fetched_at "
+                "WHERE (observations.value IS NULL OR observations.value = 0) AND excluded.value IS NOT NULL"
+            )
+        else:
+            sql = "INSERT OR IGNORE INTO observations (ticker, period, metric, value, fetched_at) VALUES (?, ?, ?, ?, ?)"
+        with self._lock, self._connect() as conn:
+            conn.executemany(sql, records)
+
+    def write_results(self, rows):
+        """FetchEngine 결과 행(dict)들의 Prefix_YYYY-MM-DD 값을 저장합니다."""
+        records = []
+        for row in rows:
+            fetched_at = row.get('Last_Updated') or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            for key, value in row.items():
+                parsed = split_metric_column(key)
+                if parsed is None:
+                    continue
+                metric, period = parsed
+                records.append((row['Ticker'], period, metric, _float_or_none(value), fetched_at))
+        self._upsert(records)
+        return len(records)
+
+    def import_wide(self, master_df):
+        """시트 스냅샷(wide)을 저장소에 채웁니다. 이미 있는 값은 건드리지 않습니다."""
+        if master_df.empty:
+            return 0
+        df = master_df.set_index('Ticker') if 'Ticker' in master_df.columns else master_df
+        metric_cols = [c for c in df.columns if c not in FIXED_COLUMNS and split_metric_column(c)]
+        if not metric_cols:
+            return 0
+        values = to_numeric_frame(df[metric_cols])
+        updated = df['Last_Updated'] if 'Last_Updated' in df.columns else None
+
+        records = []
+        for col in metric_cols:
+            metric, period = split_metric_column(col)
+            series = values[col].dropna()
+            for ticker, value in series.items():
+                fetched_at = str(updated[ticker]) if updated is not None else ''
+                records.append((ticker, period, metric, float(value), fetched_at))
+        self._upsert(records, overwrite_empty=False)
+        return len(records)
+
+    def to_wide_rows(self, rows, min_period=None, metrics=None):
+        """
+        결과 행들을 저장소 기준 wide 행으로 바꿉니다.
+        고정 컬럼(Ticker/Last_Updated/Error_Log)은 그대로 두고, 날짜 컬럼은 저장소의 값
+        (min_period 이후 분기만, metrics가 주어지면 해당 항목만)으로 채웁니다.
+        """
+        tickers = [row['Ticker'] for row in rows]
+        values = {t: {} for t in tickers}
+        with self._lock, self._connect() as conn:
+            for i in range(0, len(tickers), _CHUNK):
+                chunk = tickers[i:i + _CHUNK]
+                sql = (f"SELECT ticker, period, metric, value FROM observations "
+                       f"WHERE ticker IN ({','.join('?' * len(chunk))})")
+                params = list(chunk)
+                if min_period:
+                    sql += " AND period >= ?"
+                    params.append(min_period)
+                for ticker, period, metric, value in conn.execute(sql, params):
+                    if metrics is None or metric in metrics:
+                        values[ticker][f'{metric}_{period}'] = value
+
+        wide_rows = []
+        for row in rows:
+            wide = {k: v for k, v in row.items() if split_metric_column(k) is None}
+            wide.update(values[row['Ticker']])
+            wide_rows.append(wide)
+        return wide_rows
+
+
+def _float_or_none(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if value != value else value
@@ -1,13 +1,38 @@
 import os
 import sys
-import time
+import signal
+import asyncio
+import argparse
 import logging
-from datetime import datetime
-import pandas as pd
+from contextlib import nullcontext
+
+# 실행 요약의 시작 시각이 되도록 무거운 import보다 먼저 (marks.imports = import 소요 시간)
+from instrumentation import stats, profiled
 from dotenv import load_dotenv
+import google_auth
+
+if __name__ == "__main__":
+    # 스크립트 실행: Google 인증/스프레드시트 열기(네트워크 대기)를 아래 pandas/numpy/gspread import(약 0.6초)와
+    # 겹치도록 먼저 백그라운드에서 시작 (PipelineContext가 google_auth.early_connection()으로 결과를 받음)
+    load_dotenv()
+    google_auth.connect_early()
+
+import pandas as pd
 
-from yfinance_client import YFinanceClient
+# yfinance(실제 요청 시), FMP 클라이언트(FETCH_PROVIDERS에 fmp가 있을 때)는 필요할 때 import
+from yfinance_client import YFinanceClient, make_session, preload
+from providers import HedgedProvider
 from sheets_client import SheetsClient
+from change_feed import ChangeFeed
+from ticker_list import TickerListCache
+from fetch_engine import FetchEngine
+from financials_cache import FinancialsCache
+from scheduler import new_data_scores, shard_tickers, retry_blocked, fair_share, FailureTracker
+from long_store import LongStore, window_start
+from run_budget import RunBudget
+from checkpoint import Checkpoint, ChunkedWriter
+
+stats.mark('imports')
 
 # 로깅 설정
 logging.basicConfig(
@@ -19,105 +44,284 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def get_target_tickers(all_tickers, master_df, limit=50):
+def get_target_tickers(all_tickers, master_df, limit=50, earnings_dates=None, backfill_share=1.0, added=None):
     """
-    업데이트 대상 티커를 선정합니다.
-    1순위: Master Data에 없는 신규 티커
-    2순위: Master Data에 있지만 Last_Updated가 오래된 티커
+    업데이트 대상 티커를 선정합니다. (limit이 None/0이면 전체를 우선순위 순으로 반환)
+    - backfill 큐: Master Data에 없는 신규 티커 (목록 순서)
+    - refresh 큐: Master Data에 있지만 Last_Updated가 오래된 티커 (Next_Retry 전인 티커 제외)
+    earnings_dates({ticker: 'YYYY-MM-DD'})가 주어지면 refresh 큐는 실적 발표 일정 기반
+    "새 데이터 가능성" 점수가 높은 순(동점이면 Last_Updated가 오래된 순)으로 정렬합니다.
+    두 큐는 backfill_share 비율의 가중 라운드로빈으로 섞습니다. (기본 1.0 = 신규 티커 우선)
+    added(TickerList.added)가 주어지면 지난번 읽은 뒤 목록에 추가된 티커를 backfill 큐 맨 앞에 둡니다.
     """
     existing_tickers_set = set(master_df['Ticker'].unique()) if not master_df.empty else set()
     
     new_tickers = [t for t in all_tickers if t not in existing_tickers_set]
+    if added:
+        recent = set(added)
+        new_tickers = [t for t in new_tickers if t in recent] + [t for t in new_tickers if t not in recent]
     
     existing_candidates_df = master_df[master_df['Ticker'].isin(all_tickers)].copy()
+    # 연속 실패로 재시도 시각(Next_Retry)이 아직 오지 않은 티커는 제외
+    existing_candidates_df = existing_candidates_df[~retry_blocked(existing_candidates_df)]
     
     if not existing_candidates_df.empty and 'Last_Updated' in existing_candidates_df.columns:
         existing_candidates_df['Last_Updated_Dt'] = pd.to_datetime(
             existing_candidates_df['Last_Updated'], errors='coerce'
         )
         existing_candidates_df['Last_Updated_Dt'] = existing_candidates_df['Last_Updated_Dt'].fillna(pd.Timestamp.min)
-        
-        existing_candidates_df.sort_values(by='Last_Updated_Dt', ascending=True, inplace=True)
+
+        if earnings_dates is not None:
+            existing_candidates_df['Score'] = new_data_scores(existing_candidates_df, earnings_dates)
+            existing_candidates_df.sort_values(by=['Score', 'Last_Updated_Dt'], ascending=[False, True],
+                                               kind='stable', inplace=True)
+        else:
+            existing_candidates_df.sort_values(by='Last_Updated_Dt', ascending=True, inplace=True)
         old_tickers = existing_candidates_df['Ticker'].tolist()
     else:
         old_tickers = [t for t in all_tickers if t in existing_tickers_set]
 
-    targets = []
-    targets.extend(new_tickers)
-    
-    remaining_slots = limit - len(targets)
-    if remaining_slots > 0:
-        targets.extend(old_tickers[:remaining_slots])
-    
-    return targets[:limit]
+    # 신규(backfill) / 기존(refresh) 큐를 backfill_share 비율로 섞음 (1.0이면 신규 티커가 모두 먼저)
+    targets = fair_share(new_tickers, old_tickers, backfill_share)
+    return targets[:limit] if limit else targets
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Financial Data Pipeline (Yahoo Finance)")
+    # 여러 러너가 티커를 나눠 수집할 때 사용 (예: GitHub Actions matrix)
+    parser.add_argument('--shard-index', type=int, default=int(os.getenv("SHARD_INDEX", "0")))
+    parser.add_argument('--shard-count', type=int, default=int(os.getenv("SHARD_COUNT", "1")))
+    # 상주 모드: 인증/세션/스냅샷을 유지한 채 짧은 주기로 계속 수집 (기본은 1회 실행 후 종료)
+    parser.add_argument('--daemon', action='store_true', default=os.getenv("RUN_MODE", "cron") == "daemon")
+    return parser.parse_args(argv)
+
 
 def main():
     load_dotenv()
+    args = parse_args()
     
     logger.info("Starting Financial Data Pipeline (Yahoo Finance)...")
+
+    if args.daemon:
+        try:
+            asyncio.run(run_daemon(args.shard_index, args.shard_count))
+        except KeyboardInterrupt:
+            pass
+        return
     
     try:
-        sheets_client = SheetsClient()
-        yf_client = YFinanceClient()
-        
-        logger.info("Fetching all tickers from Google Sheets...")
-        all_tickers = sheets_client.get_all_tickers(gid=0)
-        logger.info(f"Found {len(all_tickers)} tickers in source list.")
-        
-        logger.info("Fetching existing Master Data...")
-        master_df = sheets_client.get_master_data()
-        logger.info(f"Loaded {len(master_df)} existing records.")
-        
-        targets = get_target_tickers(all_tickers, master_df, limit=50)
-        logger.info(f"Selected {len(targets)} tickers for update.")
-        
-        if not targets:
-            logger.info("No tickers to update. Exiting.")
-            return
-
-        updated_rows = []
-        
-        for i, ticker in enumerate(targets):
-            logger.info(f"[{i+1}/{len(targets)}] Fetching data for {ticker}...")
-            
-            try:
-                data = yf_client.get_financials(ticker)
-                
-                row = {
-                    'Ticker': ticker,
-                    'Last_Updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'Error_Log': ''
-                }
-                
-                if data:
-                    row.update(data)
-                else:
-                    row['Error_Log'] = 'No Data (Empty DataFrame)'
-                
-                updated_rows.append(row)
-                
-                # Yahoo Finance는 엄격한 Rate Limit은 없지만, 너무 빠르면 차단될 수 있음
-                time.sleep(1.0) 
-                
-            except Exception as e:
-                logger.error(f"Error processing {ticker}: {e}")
-                row = {
-                    'Ticker': ticker,
-                    'Last_Updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'Error_Log': f"Exception: {str(e)}"
-                }
-                updated_rows.append(row)
-
-        if updated_rows:
-            logger.info(f"Updating Google Sheets with {len(updated_rows)} records...")
-            sheets_client.update_master_data(updated_rows)
-            logger.info("Update completed successfully.")
-        else:
-            logger.info("No data collected to update.")
-
+        with profiled():
+            run_pipeline(shard_index=args.shard_index, shard_count=args.shard_count)
     except Exception as e:
         logger.critical(f"Critical error in pipeline: {e}", exc_info=True)
+        stats.count('pipeline.failed')
         sys.exit(1)
+    finally:
+        log_summary()
+
+
+def log_summary():
+    summary = stats.write_summary()
+    logger.info(f"Run summary: {summary['total_seconds']}s total, marks={summary['marks']}, "
+                f"stages={summary['stages']}, counters={summary['counters']}")
+
+
+class PipelineContext:
+    """
+    실행(사이클) 사이에 유지되는 객체들: 인증된 Sheets 클라이언트(및 Master Data 스냅샷),
+    Yahoo 세션을 가진 제공자, 로컬 캐시/저장소. cron 모드는 1회, 상주 모드는 프로세스 수명 동안 재사용합니다.
+    """
+
+    def __init__(self, shard_index=0, shard_count=1, session=None):
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.fetch_workers = int(os.getenv("FETCH_WORKERS", "4"))
+        self.fetch_rate = float(os.getenv("FETCH_RATE_PER_SEC", "0.8"))
+
+        self.sheets_client = SheetsClient(
+            **google_auth.early_connection(),
+            change_feed=ChangeFeed() if os.getenv("CHANGE_FEED", "1") == "1" else None,
+            ticker_cache=TickerListCache() if os.getenv("TICKER_LIST_CACHE", "1") == "1" else None)
+        self.cache = FinancialsCache() if os.getenv("YF_CACHE", "1") == "1" else None
+        provider = YFinanceClient(cache=self.cache, session=session)
+        # FETCH_PROVIDERS=yahoo,fmp: Yahoo가 늦거나 데이터가 없으면 FMP로 hedged 요청
+        providers = [p.strip() for p in os.getenv("FETCH_PROVIDERS", "yahoo").split(",") if p.strip()]
+        if 'fmp' in providers[1:]:
+            from fmp_client import FMPClient
+            provider = HedgedProvider(provider, FMPClient(), workers=self.fetch_workers * 2)
+        self.provider = provider
+        # 로컬 long-format 저장소가 기준 데이터, 시트는 그 wide 뷰
+        self.store = LongStore() if os.getenv("LONG_STORE", "1") == "1" else None
+
+
+def run_pipeline(shard_index=0, shard_count=1):
+    """cron 모드: 컨텍스트를 만들고 한 사이클 실행"""
+    # yfinance import를 인증/시트 읽기(네트워크 대기)와 겹치게 함
+    preload()
+    with stats.stage('startup'):
+        ctx = PipelineContext(shard_index, shard_count)
+    stats.mark('ready')
+    run_cycle(ctx)
+
+
+def run_cycle(ctx, time_budget_sec=None, master_max_age=None):
+    """
+    한 번의 수집 사이클 (cron/상주 모드 공용).
+    time_budget_sec: 이번 사이클의 시간 예산 (기본 RUN_BUDGET_MINUTES)
+    master_max_age: Master Data 스냅샷을 이 시간(초)보다 오래됐으면 다시 읽음 (None = 세션 스냅샷 재사용)
+    """
+    sheets_client, cache, store = ctx.sheets_client, ctx.cache, ctx.store
+    shard_index, shard_count = ctx.shard_index, ctx.shard_count
+
+    # 실행 예산: 고정 티커 수 대신 마감 시간/쓰기 호출 한도 안에서 가능한 만큼 수집 (0 = 예산 없음)
+    budget = None
+    if time_budget_sec or (time_budget_sec is None and float(os.getenv("RUN_BUDGET_MINUTES", "40")) > 0):
+        budget = RunBudget(time_budget_sec=time_budget_sec, initial_ticker_sec=ctx.fetch_workers / ctx.fetch_rate)
+
+    # 사이클당 요청 수 한도(FMP_MAX_REQUESTS_PER_RUN) 초기화 (상주 모드는 provider를 계속 재사용)
+    ctx.provider.start_cycle()
+
+    if cache is not None:
+        evicted = cache.evict()
+        if evicted:
+            logger.info(f"Evicted {evicted} expired cache entries.")
+
+    logger.info("Fetching all tickers from Google Sheets...")
+    with stats.stage('read_tickers'):
+        ticker_list = sheets_client.get_ticker_list(gid=0)
+    all_tickers = ticker_list.tickers
+    logger.info(f"Found {len(all_tickers)} tickers in source list"
+                f"{' (unchanged, cached)' if ticker_list.from_cache else ''}.")
+    if ticker_list.added or ticker_list.removed:
+        logger.info(f"Ticker List changed since last read: +{len(ticker_list.added)} / -{len(ticker_list.removed)}.")
+    if shard_count > 1:
+        all_tickers = shard_tickers(all_tickers, shard_index, shard_count)
+        logger.info(f"Shard {shard_index}/{shard_count}: {len(all_tickers)} tickers assigned.")
+
+    logger.info("Fetching existing Master Data...")
+    with stats.stage('read_master'):
+        master_df = sheets_client.get_master_data(max_age=master_max_age)
+    logger.info(f"Loaded {len(master_df)} existing records.")
+
+    if store is not None and store.is_empty() and not master_df.empty:
+        with stats.stage('store'):
+            seeded = store.import_wide(master_df)
+        logger.info(f"Seeded local store with {seeded} values from Master Data.")
+    # 최근 N분기만 시트에 유지 (0 = 제한 없음)
+    min_period = window_start(int(os.getenv("SHEET_QUARTER_WINDOW", "0")))
+    # 샤드 실행: 리스로 쓰기를 직렬화하고, 다른 샤드의 행을 건드리지 않도록 증분 쓰기만 사용
+    write_mode = 'incremental' if shard_count > 1 else None
+
+    def write_rows(rows):
+        if store is not None:
+            with stats.stage('store'):
+                store.write_results(rows)
+                rows = store.to_wide_rows(rows, min_period=min_period)
+        logger.info(f"Updating Google Sheets with {len(rows)} records...")
+        with stats.stage('write'):
+            lease = sheets_client.lease(f"shard-{shard_index}") if shard_count > 1 else nullcontext()
+            with lease:
+                sheets_client.update_master_data(rows, mode=write_mode, min_period=min_period)
+
+    # 수집 결과는 청크 단위로 바로 시트에 기록, 기록 전 행은 로컬 체크포인트에 보관
+    default_checkpoint = f".cache/checkpoint-{shard_index}.jsonl" if shard_count > 1 else None
+    writer = ChunkedWriter(write_rows, checkpoint=Checkpoint(os.getenv("CHECKPOINT_PATH", default_checkpoint)),
+                           budget=budget)
+    resumed = set(writer.pending)
+    if resumed:
+        # 지난 실행이 기록하지 못하고 죽은 행부터 기록 (해당 티커는 다시 받지 않음)
+        logger.info(f"Resuming {len(resumed)} rows from checkpoint.")
+        stats.count('tickers.resumed', len(resumed))
+        writer.flush()
+
+    with stats.stage('select'):
+        # 큐 길이 상한 (0 = 제한 없음, 실제 처리량은 실행 예산이 결정)
+        limit = int(os.getenv("FETCH_LIMIT", "0"))
+        # 실적 발표 일정 기반 우선순위 (캐시된 발표일만 사용, 네트워크 요청 없음)
+        earnings_dates = None
+        if os.getenv("SCHEDULER", "earnings") == "earnings":
+            earnings_dates = cache.get_earnings_dates() if cache is not None else {}
+        candidates = [t for t in all_tickers if t not in resumed]
+        # 신규 티커(backfill)와 기존 티커 갱신(refresh)이 나눠 가질 슬롯 비율
+        backfill_share = float(os.getenv("BACKFILL_SHARE", "0.5"))
+        targets = get_target_tickers(candidates, master_df, limit=limit, earnings_dates=earnings_dates,
+                                     backfill_share=backfill_share, added=ticker_list.added)
+        existing = set(master_df['Ticker']) if not master_df.empty else set()
+        backfill = {t for t in targets if t not in existing}
+    logger.info(f"Queued {len(targets)} tickers for update ({len(backfill)} backfill).")
+    stats.count('tickers.selected', len(targets))
+
+    if not targets:
+        logger.info("No tickers to update. Exiting.")
+        return
+
+    with stats.stage('fetch'):
+        # Yahoo Finance는 엄격한 Rate Limit은 없지만, 너무 빠르면 차단될 수 있음
+        # -> 공유 토큰 버킷으로 전체 요청 속도를 제한하고 429 시 자동 감속
+        engine = FetchEngine(
+            ctx.provider,
+            workers=ctx.fetch_workers,
+            rate=ctx.fetch_rate,
+            max_retries=int(os.getenv("FETCH_MAX_RETRIES", "3")),
+        )
+        # 티커별 연속 실패 횟수/재시도 시각을 행에 기록한 뒤 청크 기록기로 전달
+        failures = FailureTracker(master_df)
+        # backfill bulk 모드: 신규 티커는 분기 + 연간 재무제표를 한 번에 받아 로컬 저장소에 이력으로 보관
+        # (연간 값은 시트에 쓰지 않으므로 로컬 저장소가 없으면 받지 않음)
+        bulk = backfill if store is not None and os.getenv("BACKFILL_BULK", "1") == "1" else None
+        # 서킷 브레이커가 Yahoo 장애로 판단하는 동안의 실패는 티커별 실패 횟수에 넣지 않음
+        fetched = engine.run(targets, budget=budget, bulk=bulk,
+                             on_result=lambda row: writer.add(failures.apply(row, transient=engine.breaker.degraded)))
+    stats.count('tickers.fetched', fetched)
+
+    # 남은 행 기록 (실패하면 예외, 행은 체크포인트에 남아 다음 실행이 이어서 기록)
+    writer.flush()
+    if writer.written:
+        logger.info(f"Update completed successfully. {writer.written} rows written.")
+    else:
+        logger.info("No data collected to update.")
+
+async def run_daemon(shard_index=0, shard_count=1):
+    """
+    상주 모드: 인증된 Sheets 클라이언트, keep-alive Yahoo 세션, Master Data 스냅샷을 유지한 채
+    DAEMON_CYCLE_MINUTES(기본 5분) 예산의 짧은 사이클을 DAEMON_INTERVAL_SEC(기본 60초) 간격으로 반복합니다.
+    SIGINT/SIGTERM을 받으면 진행 중인 사이클을 마친 뒤 종료합니다.
+    """
+    cycle_budget = float(os.getenv("DAEMON_CYCLE_MINUTES", "5")) * 60
+    interval = float(os.getenv("DAEMON_INTERVAL_SEC", "60"))
+    # 다른 작성자(샤드, 사람)의 변경을 선정에 반영하기 위해 스냅샷을 주기적으로 다시 읽음
+    master_max_age = float(os.getenv("DAEMON_MASTER_MAX_AGE_SEC", "3600"))
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+
+    with stats.stage('startup'):
+        ctx = PipelineContext(shard_index, shard_count, session=make_session())
+    log_summary()
+
+    cycle = 0
+    while not stop.is_set():
+        cycle += 1
+        stats.reset()
+        logger.info(f"Daemon cycle {cycle} starting.")
+        try:
+            # 수집/쓰기는 블로킹 I/O라 워커 스레드에서 실행 (이벤트 루프는 신호 처리/대기만)
+            await asyncio.to_thread(run_cycle, ctx, cycle_budget, master_max_age)
+        except Exception as e:
+            logger.error(f"Daemon cycle {cycle} failed: {e}", exc_info=True)
+            stats.count('pipeline.failed')
+        finally:
+            log_summary()
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+    logger.info("Daemon stopped.")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+# 고정 컬럼 (날짜 컬럼이 아닌 것들)
+FIXED_COLUMNS = ['Last_Updated', 'Error_Log', 'Fail_Count', 'Next_Retry']
+# 날짜 컬럼 오른쪽에 오는 고정 컬럼 (실패 기록)
+TRAILING_COLUMNS = ['Error_Log', 'Fail_Count', 'Next_Retry']
+# 연간 값 항목 접두사 (예: FY_Rev_2024-12-31). 로컬 저장소에만 보관하고 시트에는 쓰지 않음
+ANNUAL_PREFIX = 'FY_'
+
+
+def date_sort_key(col_name):
+    """
+    날짜 컬럼 정렬 키. 뒤 10자리(YYYY-MM-DD)를 날짜로, 앞부분을 항목 접두사로 봅니다.
+    예: Rev_2025-12-31 -> ('2025-12-31', 'Rev_')
+    """
+    if len(col_name) >= 10:
+        return (col_name[-10:], col_name[:-10])
+    return ("", col_name)
+
+
+def sort_date_columns(columns):
+    """날짜 내림차순(최신이 왼쪽), 같은 날짜는 항목 접두사 내림차순으로 정렬합니다."""
+    return sorted(columns, key=date_sort_key, reverse=True)
+
+
+def to_float_array(values):
+    """2차원 배열을 한 번에 float64로 변환합니다. (빈 문자열/숫자가 아닌 값 -> NaN)"""
+    values = np.asarray(values)
+    if values.dtype.kind not in 'fiub':
+        try:
+            # 시트 값은 대부분 숫자 또는 빈 문자열이므로 빈 문자열만 NaN으로 바꿔 바로 변환
+            values = np.where(values == '', np.nan, values).astype('float64')
+        except (TypeError, ValueError):
+            flat = pd.to_numeric(pd.Series(values.ravel()), errors='coerce')
+            values = flat.to_numpy(dtype='float64').reshape(values.shape)
+    return values.astype('float64', copy=False)
+
+
+def to_numeric_frame(df):
+    """
+    프레임 전체를 한 번에 float64로 변환합니다. (빈 문자열/숫자가 아닌 값 -> NaN)
+    컬럼별 pd.to_numeric 루프 대신 전체 셀을 1차원으로 펼쳐 한 번만 변환합니다.
+    """
+    if df.empty:
+        return df.astype('float64')
+    return pd.DataFrame(to_float_array(df.to_numpy()), index=df.index, columns=df.columns)
+
+
+def merge_master_frames(df_old, df_new, min_period=None):
+    """
+    기존/신규 Master Data를 병합해 최종 시트 형태(Ticker 컬럼 + 컬럼 순서 확정)로 반환합니다.
+    df_old, df_new: Ticker 인덱스 DataFrame
+    min_period('YYYY-MM-DD'): 주어지면 이보다 오래된 날짜 컬럼은 결과에서 제외
+    연간 값(FY_ 접두사) 컬럼은 시트에 쓰지 않으므로 결과에서 제외
+
+    병합 규칙 (전체 프레임 단위로 한 번에 계산):
+    - 날짜 컬럼: 기존 값 유지, 단 기존 값이 0/NaN/빈 값이고 신규 값이 있으면 신규 값 사용
+    - Last_Updated: 신규 값이 있으면 신규 값
+    - Error_Log / Fail_Count / Next_Retry: 이번에 수집한 티커는 신규 값, 나머지는 기존 값 유지
+
+    날짜 컬럼은 float64(빈 값은 NaN)로 반환되며, 빈 문자열 변환은 시트 I/O 시점에 합니다.
+    """
+    all_cols = set(df_new.columns)
+    if not df_old.empty:
+        all_cols.update(df_old.columns)
+    date_cols = sort_date_columns(c for c in all_cols
+                                  if c not in FIXED_COLUMNS and c != 'Ticker' and not c.startswith(ANNUAL_PREFIX))
+    if min_period:
+        date_cols = [c for c in date_cols if date_sort_key(c)[0] >= min_period]
+
+    # 최종 컬럼 순서: Ticker + Last_Updated + 날짜 컬럼(정렬) + Error_Log + Fail_Count + Next_Retry
+    final_column_order = ['Last_Updated'] + date_cols + TRAILING_COLUMNS
+
+    if df_old.empty:
+        df_old = pd.DataFrame(index=df_new.index[:0])
+        all_index = df_new.index
+    else:
+        all_index = df_old.index.union(df_new.index)
+
+    # 1. 날짜 컬럼: 같은 모양으로 정렬 후 마스크 한 번으로 병합
+    old_vals = to_numeric_frame(df_old.reindex(index=all_index, columns=date_cols))
+    new_vals = to_numeric_frame(df_new.reindex(index=all_index, columns=date_cols))
+    keep_old = (old_vals.notna() & old_vals.ne(0)) | new_vals.isna()
+    merged = old_vals.where(keep_old, new_vals)
+
+    # 2. 고정 컬럼
+    in_new = all_index.isin(df_new.index)
+    fixed = {}
+    for col in FIXED_COLUMNS:
+        old_col = df_old[col].reindex(all_index) if col in df_old.columns else pd.Series(np.nan, index=all_index)
+        new_col = df_new[col].reindex(all_index) if col in df_new.columns else pd.Series(np.nan, index=all_index)
+        if col == 'Last_Updated':
+            value = new_col.where(new_col.notna(), old_col)
+        else:
+            value = new_col.where(in_new, old_col)
+        fixed[col] = value.fillna('').astype(object)
+
+    final_df = pd.concat([fixed['Last_Updated'].rename('Last_Updated'), merged]
+                         + [fixed[col].rename(col) for col in TRAILING_COLUMNS], axis=1)
+    final_df = final_df[final_column_order]
+    final_df.index = all_index.rename('Ticker')
+    return final_df.reset_index()
+
+
+def filled_cells(df_old, final_df, tickers):
+    """
+    병합 결과에서 새로 채워진 날짜 컬럼 셀을 찾습니다. (변경 기록용)
+    기존 값이 없거나(NaN/빈 값/새 컬럼/새 티커) 0이었는데 병합 후 값이 생긴 셀만 대상입니다.
+    df_old: 병합 전 Ticker 인덱스 DataFrame, final_df: merge_master_frames 결과
+    tickers: 이번에 수집한 티커 (병합 결과가 바뀔 수 있는 행)
+    반환: (ticker, 항목, 기간 'YYYY-MM-DD', 이전 값(None 또는 0.0), 새 값) 목록
+    """
+    date_cols = [c for c in final_df.columns if c != 'Ticker' and c not in FIXED_COLUMNS]
+    touched = final_df[final_df['Ticker'].isin(tickers)].set_index('Ticker')
+    if touched.empty or not date_cols:
+        return []
+    new_vals = to_numeric_frame(touched[date_cols])
+    old_vals = to_numeric_frame(df_old.reindex(index=new_vals.index, columns=date_cols))
+    filled = new_vals.notna() & new_vals.ne(0) & ~(old_vals.notna() & old_vals.ne(0))
+
+    changes = []
+    old_arr, new_arr = old_vals.to_numpy(), new_vals.to_numpy()
+    for i, j in zip(*np.nonzero(filled.to_numpy())):
+        period, prefix = date_sort_key(date_cols[j])
+        old = old_arr[i, j]
+        changes.append((new_vals.index[i], prefix.rstrip('_'), period,
+                        None if np.isnan(old) else float(old), float(new_arr[i, j])))
+    return changes
@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+from master_merge import to_float_array
+from long_store import split_metric_column
+
+
+class MetricCube:
+    """
+    티커 × 분기 × 항목 값을 하나의 float64 배열로 보관합니다. (빈 값/숫자가 아닌 값 = NaN)
+    values[t, p, m] = tickers[t]의 periods[p] 분기 metrics[m] 값
+    - periods는 최신이 앞, metrics는 항목 접두사 내림차순이므로 (티커, 분기 x 항목)으로 펼친 순서가
+      시트의 날짜 컬럼 순서(sort_date_columns)와 같습니다. 모든 컬럼이 있으면 to_wide()는 복사 없이 view를 반환합니다.
+    - present[p, m]: 시트에 해당 '항목_날짜' 컬럼이 있는지 (값이 모두 비어 있는 컬럼도 유지)
+    시트의 wide 레이아웃과는 I/O 경계(from_columns / from_rows / to_wide)에서만 변환합니다.
+    """
+
+    def __init__(self, tickers, periods, metrics, values, present=None):
+        self.tickers = pd.Index(tickers, name='Ticker')
+        self.periods = list(periods)
+        self.metrics = list(metrics)
+        self.values = values
+        if present is None:
+            present = np.ones((len(self.periods), len(self.metrics)), dtype=bool)
+        self.present = present
+
+    @property
+    def mask(self):
+        """값이 있는 셀 (NaN이 아닌 셀)"""
+        return ~np.isnan(self.values)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.present.nbytes
+
+    @classmethod
+    def _empty(cls, tickers, columns):
+        """columns('항목_YYYY-MM-DD')에 맞는 NaN 배열과 각 컬럼의 (분기, 항목) 위치"""
+        parsed = [split_metric_column(c) for c in columns]
+        metrics = sorted({m for m, _ in parsed}, key=lambda m: m + '_', reverse=True)
+        periods = sorted({p for _, p in parsed}, reverse=True)
+        metric_of = {m: i for i, m in enumerate(metrics)}
+        period_of = {p: i for i, p in enumerate(periods)}
+        pi = np.array([period_of[p] for _, p in parsed], dtype=np.intp)
+        mi = np.array([metric_of[m] for m, _ in parsed], dtype=np.intp)
+        present = np.zeros((len(periods), len(metrics)), dtype=bool)
+        present[pi, mi] = True
+        values = np.full((len(tickers), len(periods), len(metrics)), np.nan)
+        return cls(tickers, periods, metrics, values, present), pi, mi
+
+    @classmethod
+    def from_columns(cls, tickers, columns, values):
+        """
+        wide 레이아웃(티커 x '항목_YYYY-MM-DD' 컬럼)의 2차원 값으로 만듭니다.
+        values는 시트에서 읽은 object 배열(빈 값 '')이어도 되며 한 번에 float64로 변환합니다.
+        """
+        cube, pi, mi = cls._empty(tickers, columns)
+        if len(columns) and len(tickers):
+            cube.values[:, pi, mi] = to_float_array(values)
+        return cube
+
+    @classmethod
+    def from_rows(cls, rows):
+        """FetchEngine 결과 행(dict) 목록의 '항목_YYYY-MM-DD' 값으로 만듭니다. (고정 컬럼은 무시)"""
+        columns = list(dict.fromkeys(k for row in rows for k in row if split_metric_column(k)))
+        tickers = [row['Ticker'] for row in rows]
+        cube, pi, mi = cls._empty(tickers, columns)
+        position = {c: (p, m) for c, p, m in zip(columns, pi, mi)}
+        for t, row in enumerate(rows):
+            for key, value in row.items():
+                if key in position:
+                    p, m = position[key]
+                    cube.values[t, p, m] = _float_or_nan(value)
+        return cube
+
+    def columns(self):
+        """있는 날짜 컬럼 이름 (시트 순서)"""
+        pi, mi = np.nonzero(self.present)
+        return [f'{self.metrics[m]}_{self.periods[p]}' for p, m in zip(pi, mi)]
+
+    def to_wide(self, columns=None):
+        """
+        Ticker 인덱스 float64 DataFrame으로 펼칩니다.
+        columns가 주어지면 그 순서로 (큐브에 없는 컬럼은 NaN), 아니면 있는 컬럼 전체를 시트 순서로 반환합니다.
+        """
+        n = len(self.tickers)
+        if columns is None:
+            columns = self.columns()
+            if self.present.all():
+                data = self.values.reshape(n, len(self.periods) * len(self.metrics))
+            else:
+                pi, mi = np.nonzero(self.present)
+                data = self.values[:, pi, mi]
+            return pd.DataFrame(data, index=self.tickers, columns=columns)
+
+        period_of = {p: i for i, p in enumerate(self.periods)}
+        metric_of = {m: i for i, m in enumerate(self.metrics)}
+        data = np.full((n, len(columns)), np.nan)
+        known, pi, mi = [], [], []
+        for k, col in enumerate(columns):
+            parsed = split_metric_column(col)
+            if parsed and parsed[0] in metric_of and parsed[1] in period_of:
+                known.append(k)
+                mi.append(metric_of[parsed[0]])
+                pi.append(period_of[parsed[1]])
+        if known:
+            data[:, known] = self.values[:, pi, mi]
+        return pd.DataFrame(data, index=self.tickers, columns=list(columns))
+
+
+def split_columns(tickers, columns, values):
+    """
+    wide 레이아웃(티커 x 컬럼)의 2차원 값을 (날짜가 아닌 컬럼의 DataFrame, MetricCube)로 나눕니다.
+    날짜 컬럼은 float64 큐브로, 나머지(Last_Updated, Error_Log 등)는 원래 값 그대로 둡니다.
+    """
+    columns = list(columns)
+    metric_idx = [j for j, c in enumerate(columns) if split_metric_column(str(c))]
+    metric_set = set(metric_idx)
+    fixed_idx = [j for j in range(len(columns)) if j not in metric_set]
+    fixed = pd.DataFrame(values[:, fixed_idx], index=pd.Index(tickers, name='Ticker'),
+                         columns=[columns[j] for j in fixed_idx])
+    cube = MetricCube.from_columns(tickers, [columns[j] for j in metric_idx], values[:, metric_idx])
+    return fixed, cube
+
+
+def split_frame(df):
+    """Ticker 인덱스 wide DataFrame을 (고정 컬럼 DataFrame, MetricCube)로 나눕니다. (split_columns 참고)"""
+    return split_columns(df.index, df.columns, df.to_numpy(dtype=object))
+
+
+def join_frame(fixed, cube, columns=None):
+    """
+    split_columns의 반대: 고정 컬럼 + 날짜 컬럼(columns 순서, 기본 시트 순서) wide DataFrame.
+    날짜 컬럼 블록은 가능하면 큐브 배열의 view이므로 결과를 수정하면 안 됩니다.
+    """
+    wide = cube.to_wide(columns)
+    # 행 순서가 같으므로 정렬(align) 없이 배열로 삽입 (concat은 날짜 블록을 복사함)
+    for k in range(fixed.shape[1]):
+        wide.insert(k, fixed.columns[k], fixed.iloc[:, k].to_numpy(), allow_duplicates=True)
+    return wide
+
+
+def rows_to_frame(rows):
+    """FetchEngine 결과 행(dict) 목록 -> Ticker 인덱스 wide DataFrame (날짜 컬럼은 float64)"""
+    fixed = pd.DataFrame([{k: v for k, v in row.items() if not split_metric_column(k)} for row in rows])
+    return join_frame(fixed.drop(columns='Ticker'), MetricCube.from_rows(rows))
+
+
+def _float_or_nan(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
@@ -0,0 +1,120 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from instrumentation import stats
+
+logger = logging.getLogger(__name__)
+
+
+class FinancialsProvider:
+    """
+    재무 데이터 제공자 인터페이스. (YFinanceClient, FMPClient, HedgedProvider)
+    - get_financials(ticker, include_annual=False): {항목_YYYY-MM-DD: 값} dict, 데이터가 없으면 None
+      Rate Limit(429)은 예외로 전달 (FetchEngine이 백오프 후 재시도)
+      include_annual은 연간 값(FY_ 키)도 함께 달라는 요청이며, 지원하지 않는 제공자는 무시합니다.
+    - is_cached(ticker): 네트워크 요청 없이 응답할 수 있는지 여부
+    - request_cost(ticker, include_annual=False): get_financials가 보낼 요청 수 (FetchEngine이 그만큼 토큰을 받음)
+    - start_cycle(): 수집 사이클 시작 시 호출 (사이클당 요청 수 한도 초기화 등, 상주 모드에서는 매 사이클)
+    """
+    name = 'provider'
+
+    def get_financials(self, ticker_symbol, include_annual=False):
+        raise NotImplementedError
+
+    def is_cached(self, ticker_symbol):
+        return False
+
+    def request_cost(self, ticker_symbol, include_annual=False):
+        return 0 if self.is_cached(ticker_symbol) else 1
+
+    def start_cycle(self):
+        pass
+
+
+class HedgedProvider(FinancialsProvider):
+    """
+    주 제공자(primary)가 최근 응답 지연의 percentile 이내에 답하지 않으면
+    보조 제공자(secondary)에도 같은 요청을 보내고 먼저 데이터를 준 쪽을 사용합니다.
+    주 제공자가 데이터 없음(None)이나 에러로 끝나도 보조 제공자로 한 번 더 시도합니다.
+    둘 다 실패하면 주 제공자의 결과(None 또는 예외)를 그대로 돌려줍니다.
+    보조 결과를 돌려줘 가려진 주 제공자의 예외(429 등)는 on_primary_error(e)로 알립니다. (FetchEngine이 설정)
+    """
+
+    def __init__(self, primary, secondary, percentile=None, initial_delay=None,
+                 min_samples=20, window=200, workers=8):
+        self.primary = primary
+        self.secondary = secondary
+        self.name = f"{primary.name}+{secondary.name}"
+        self.percentile = float(percentile if percentile is not None else os.getenv("HEDGE_PERCENTILE", "0.9"))
+        # 지연 표본이 min_samples개 모이기 전에 사용할 대기 시간 (초)
+        self.initial_delay = float(initial_delay if initial_delay is not None
+                                   else os.getenv("HEDGE_AFTER_SEC", "3"))
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        # 보조 요청을 띄운 뒤 늦게 끝나는 주 요청은 백그라운드에서 마저 끝나도록 둠 (캐시는 채워짐)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self.on_primary_error = None
+
+    def is_cached(self, ticker_symbol):
+        return self.primary.is_cached(ticker_symbol)
+
+    def request_cost(self, ticker_symbol, include_annual=False):
+        # 토큰 버킷은 주 제공자(Yahoo)의 요청 속도 제한 (보조 제공자는 자체 요청 수 한도 사용)
+        return self.primary.request_cost(ticker_symbol, include_annual=include_annual)
+
+    def start_cycle(self):
+        self.primary.start_cycle()
+        self.secondary.start_cycle()
+
+    def hedge_delay(self):
+        """보조 요청을 보내기 전 기다릴 시간: 최근 주 제공자 응답 지연의 percentile"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return self.initial_delay
+        return samples[min(len(samples) - 1, int(self.percentile * len(samples)))]
+
+    def _timed_primary(self, ticker_symbol, include_annual):
+        start = time.perf_counter()
+        result = self.primary.get_financials(ticker_symbol, include_annual=include_annual)
+        with self._lock:
+            self._latencies.append(time.perf_counter() - start)
+        return result
+
+    def get_financials(self, ticker_symbol, include_annual=False):
+        if self.primary.is_cached(ticker_symbol) and not include_annual:
+            return self.primary.get_financials(ticker_symbol)
+
+        primary = self._executor.submit(self._timed_primary, ticker_symbol, include_annual)
+        done, _ = wait([primary], timeout=self.hedge_delay())
+        if done and primary.exception() is None and primary.result():
+            return primary.result()
+
+        # 늦거나, 데이터가 없거나, 실패 -> 보조 제공자
+        if not done:
+            stats.count('hedge.fired')
+        secondary = self._executor.submit(self.secondary.get_financials, ticker_symbol,
+                                          include_annual=include_annual)
+        pending = {primary, secondary}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None and future.result():
+                    if future is secondary:
+                        stats.count('hedge.secondary_wins')
+                        # 주 요청이 (지금 또는 나중에) 예외로 끝나면 호출부에 알림
+                        primary.add_done_callback(self._report_primary_error)
+                    return future.result()
+
+        # 둘 다 데이터 없음/실패: 주 제공자 기준으로 결과 전달
+        return primary.result()
+
+    def _report_primary_error(self, future):
+        error = future.exception()
+        if error is not None and self.on_primary_error is not None:
+            self.on_primary_error(error)
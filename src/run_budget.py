@@ -0,0 +1,62 @@
+import os
+import time
+import threading
+
+from instrumentation import stats
+
+# 증분 쓰기 1회에 드는 최대 쓰기 호출 수 (delete_columns + insert_cols + add_rows + batch_update)
+WRITE_CALLS_PER_FLUSH = 4
+
+
+class RunBudget:
+    """
+    한 번의 실행에 주어진 시간/Sheets 쓰기 호출 예산.
+    고정된 티커 수 대신, 티커 하나를 더 수집해도 예상 종료 시각이
+    (마감 - 시트 쓰기 여유 시간)을 넘지 않는 동안 계속 수집합니다.
+    티커당 소요 시간은 실제 측정값의 지수이동평균(EWMA)으로 추정하므로
+    Yahoo 응답이 빠른 날에는 자동으로 더 많은 티커를 처리합니다.
+    """
+
+    def __init__(self, time_budget_sec=None, write_reserve_sec=None, max_write_calls=None,
+                 initial_ticker_sec=5.0, smoothing=0.2, started_at=None):
+        self.time_budget_sec = float(time_budget_sec if time_budget_sec is not None
+                                     else float(os.getenv("RUN_BUDGET_MINUTES", "40")) * 60)
+        self.write_reserve_sec = float(write_reserve_sec if write_reserve_sec is not None
+                                       else os.getenv("RUN_WRITE_RESERVE_SEC", "120"))
+        # 짧은 예산(상주 모드 사이클)에서는 여유 시간이 예산 대부분을 차지하지 않도록 1/4로 제한
+        self.write_reserve_sec = min(self.write_reserve_sec, self.time_budget_sec / 4)
+        # Sheets API 쓰기 요청 한도 (사용자당 분당 60회) 안에서 이번 실행이 쓸 수 있는 호출 수
+        self.max_write_calls = int(max_write_calls if max_write_calls is not None
+                                   else os.getenv("SHEETS_WRITE_QUOTA", "40"))
+        self.started_at = started_at if started_at is not None else time.monotonic()
+        self.deadline = self.started_at + self.time_budget_sec
+        self.ticker_sec = float(initial_ticker_sec)
+        self.smoothing = smoothing
+        self._write_calls_start = stats.counters.get('sheets.write_calls', 0)
+        self._lock = threading.Lock()
+
+    def observe_ticker(self, seconds):
+        """티커 하나의 실제 소요 시간(대기 포함)을 반영합니다."""
+        with self._lock:
+            self.ticker_sec += self.smoothing * (seconds - self.ticker_sec)
+
+    def time_left(self):
+        return self.deadline - time.monotonic()
+
+    def write_calls_used(self):
+        return stats.counters.get('sheets.write_calls', 0) - self._write_calls_start
+
+    def can_flush(self, reserved_flushes=0):
+        """쓰기 1회를 더 해도 (reserved_flushes회분을 남겨두고) 쓰기 호출 예산 안인지"""
+        needed = (1 + reserved_flushes) * WRITE_CALLS_PER_FLUSH
+        return self.write_calls_used() + needed <= self.max_write_calls
+
+    def allows_next(self):
+        """
+        다음 티커 수집을 시작해도 되는지.
+        - 예상 종료 시각(지금 + 티커당 추정 시간)이 쓰기 여유 시간을 뺀 마감 이내
+        - 마지막 시트 쓰기 1회분의 호출 예산이 남아 있음
+        """
+        with self._lock:
+            projected = time.monotonic() + self.ticker_sec
+        return projected <= self.deadline - self.write_reserve_sec and self.can_flush()
@@ -0,0 +1,171 @@
+import os
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from master_merge import sort_date_columns, to_numeric_frame
+from yfinance_client import is_rate_limit_message, is_transport_message, NO_DATA_ERROR
+
+# 분기말 이후 실적 발표까지의 일반적인 기간 (발표일 정보가 없을 때 사용)
+QUARTER_DAYS = 91
+REPORT_LAG_DAYS = 45
+# 발표 예정일이 이만큼 지나도 새 분기가 안 들어오면 "곧 나올 것"으로 보지 않음
+OVERDUE_GIVE_UP_DAYS = 60
+# 연속 실패한 티커의 재시도 간격: RETRY_BASE_HOURS * 2^(실패 횟수 - 1), 최대 RETRY_MAX_DAYS
+RETRY_BASE_HOURS = 6
+RETRY_MAX_DAYS = 30
+RETRY_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def latest_quarters(master_df):
+    """각 행에서 값이 채워진 가장 최근 Rev_YYYY-MM-DD 날짜 (없으면 NaT)"""
+    rev_cols = sort_date_columns(c for c in master_df.columns if c.startswith('Rev_'))
+    if not rev_cols:
+        return pd.Series(pd.NaT, index=master_df.index, dtype='datetime64[ns]')
+
+    values = to_numeric_frame(master_df[rev_cols]).to_numpy()
+    has_value = ~np.isnan(values) & (values != 0)
+    first = has_value.argmax(axis=1)
+    dates = pd.to_datetime([c[-10:] for c in rev_cols], errors='coerce')
+    latest = pd.Series(dates[first], index=master_df.index)
+    return latest.where(has_value.any(axis=1))
+
+
+def new_data_scores(master_df, earnings_dates=None, now=None):
+    """
+    기존 티커별 "새 분기 데이터가 있을 가능성" 점수를 계산합니다. (높을수록 먼저 수집)
+    - 2.5: 발표 예정일이 지났는데 그 이후 아직 수집하지 않음
+    - 2.0: 발표 예정일이 지났고 수집도 했지만 새 분기가 아직 시트에 없음 (Yahoo 반영 지연)
+    - 1.0: 시트에 분기 데이터가 전혀 없음
+    - 0.0: 다음 발표일이 아직 오지 않음
+    발표 예정일은 캐시된 실적 발표일(earnings_dates)이 다음 분기말(최신 분기 + 91일) 이후라면 그 값을,
+    아니면 최신 분기 + 91일 + 45일로 추정합니다. (그보다 이른 발표일은 이미 수집한 분기의 발표)
+    """
+    now = pd.Timestamp(now or pd.Timestamp.now())
+    earnings_dates = earnings_dates or {}
+
+    latest = latest_quarters(master_df)
+    estimated = latest + pd.Timedelta(days=QUARTER_DAYS + REPORT_LAG_DAYS)
+    calendar = pd.to_datetime(master_df['Ticker'].map(earnings_dates), errors='coerce')
+    expected = calendar.where(calendar > latest + pd.Timedelta(days=QUARTER_DAYS), estimated)
+
+    if 'Last_Updated' in master_df.columns:
+        last_updated = pd.to_datetime(master_df['Last_Updated'], errors='coerce')
+    else:
+        last_updated = pd.Series(pd.NaT, index=master_df.index)
+    last_updated = last_updated.fillna(pd.Timestamp.min)
+
+    due = (expected <= now) & (now - expected <= pd.Timedelta(days=OVERDUE_GIVE_UP_DAYS))
+    score = pd.Series(0.0, index=master_df.index)
+    score[latest.isna()] = 1.0
+    score[due] = 2.0
+    score[due & (last_updated < expected)] = 2.5
+    return score
+
+
+def expected_report_date(latest_quarter, earnings_date=None):
+    """
+    티커 하나의 다음 실적 발표 예정일 (new_data_scores와 같은 추정, 최신 분기가 없으면 None)
+    latest_quarter / earnings_date: 'YYYY-MM-DD' 또는 None
+    """
+    if not latest_quarter:
+        return None
+    latest = pd.Timestamp(latest_quarter)
+    if earnings_date and pd.Timestamp(earnings_date) > latest + pd.Timedelta(days=QUARTER_DAYS):
+        return pd.Timestamp(earnings_date)
+    return latest + pd.Timedelta(days=QUARTER_DAYS + REPORT_LAG_DAYS)
+
+
+def report_due(expected, now=None):
+    """발표 예정일이 지났고 OVERDUE_GIVE_UP_DAYS 이내인지 (new_data_scores의 2.0 이상 조건)"""
+    if expected is None:
+        return False
+    now = pd.Timestamp(now or pd.Timestamp.now())
+    return expected <= now and now - expected <= pd.Timedelta(days=OVERDUE_GIVE_UP_DAYS)
+
+
+def shard_of(ticker, shard_count):
+    """티커가 속한 샤드 번호. 실행/프로세스와 무관하게 항상 같은 값 (md5 기반)"""
+    digest = hashlib.md5(str(ticker).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+
+def shard_tickers(tickers, shard_index, shard_count):
+    """티커 목록 중 shard_index번 샤드에 속한 것만 (순서 유지)"""
+    if shard_count <= 1:
+        return list(tickers)
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"shard_index must be in [0, {shard_count}), got {shard_index}")
+    return [t for t in tickers if shard_of(t, shard_count) == shard_index]
+
+
+def fair_share(backfill, refresh, share):
+    """
+    두 큐를 가중 라운드로빈으로 합칩니다. 앞에서부터 어디서 끊어도 backfill 비율이 share를 넘지 않으며,
+    한쪽 큐가 비면 나머지는 다른 큐로 채웁니다. (share=1.0: backfill 전부 먼저, 0.0: refresh 전부 먼저)
+    """
+    share = min(1.0, max(0.0, float(share)))
+    merged = []
+    b = r = 0
+    while b < len(backfill) or r < len(refresh):
+        if r >= len(refresh) or (b < len(backfill) and b < share * (b + r + 1)):
+            merged.append(backfill[b])
+            b += 1
+        else:
+            merged.append(refresh[r])
+            r += 1
+    return merged
+
+
+def retry_blocked(master_df, now=None):
+    """Next_Retry가 아직 오지 않은 행 (연속 실패로 재시도를 미룬 티커)"""
+    if 'Next_Retry' not in master_df.columns:
+        return pd.Series(False, index=master_df.index)
+    now = pd.Timestamp(now or pd.Timestamp.now())
+    next_retry = pd.to_datetime(master_df['Next_Retry'], errors='coerce', format=RETRY_TIMESTAMP_FORMAT)
+    return next_retry > now
+
+
+class FailureTracker:
+    """
+    티커별 연속 실패 횟수(Fail_Count)와 다음 재시도 시각(Next_Retry)을 결과 행에 기록합니다.
+    - 데이터를 받으면 두 값을 비움
+    - 데이터 없음/에러면 실패 횟수 + 1, 재시도 시각을 지수적으로 늦춤
+    - Rate Limit/네트워크 장애로 끝났거나 서킷 브레이커가 장애로 판단한 동안(transient=True)의 예외는
+      티커 문제가 아니므로 기존 값을 그대로 유지
+    - 데이터 없음(빈 응답)은 언제나 티커의 실패로 셈 (죽은 티커가 매 실행 큐 앞을 차지하지 않도록)
+    """
+
+    def __init__(self, master_df, base_hours=None, max_days=None):
+        self.base_hours = float(base_hours if base_hours is not None
+                                else os.getenv("RETRY_BASE_HOURS", RETRY_BASE_HOURS))
+        self.max_days = float(max_days if max_days is not None else os.getenv("RETRY_MAX_DAYS", RETRY_MAX_DAYS))
+        self.previous = {}
+        if not master_df.empty and 'Fail_Count' in master_df.columns:
+            counts = pd.to_numeric(master_df['Fail_Count'], errors='coerce').fillna(0).astype(int)
+            next_retry = master_df['Next_Retry'] if 'Next_Retry' in master_df.columns else ''
+            previous = pd.DataFrame({'Ticker': master_df['Ticker'], 'count': counts, 'next': next_retry})
+            previous = previous[previous['count'] > 0]
+            self.previous = {t: (c, n) for t, c, n in previous.itertuples(index=False)}
+
+    def backoff(self, fail_count):
+        hours = self.base_hours * 2 ** (fail_count - 1)
+        return pd.Timedelta(hours=min(hours, self.max_days * 24))
+
+    def apply(self, row, now=None, transient=False):
+        """결과 행에 Fail_Count/Next_Retry를 채워 반환합니다. (transient: FetchEngine.breaker.degraded)"""
+        error = row.get('Error_Log') or ''
+        count, next_retry = self.previous.get(row['Ticker'], (0, ''))
+        if not error:
+            row['Fail_Count'], row['Next_Retry'] = '', ''
+        elif (transient and error != NO_DATA_ERROR) or is_rate_limit_message(error) or is_transport_message(error):
+            # 티커와 무관한 일시적 실패
+            row['Fail_Count'], row['Next_Retry'] = (count or ''), next_retry
+        else:
+            count += 1
+            now = pd.Timestamp(now or pd.Timestamp.now())
+            row['Fail_Count'] = count
+            row['Next_Retry'] = (now + self.backoff(count)).strftime(RETRY_TIMESTAMP_FORMAT)
+        return row
+
@@ -1,177 +1,553 @@
 import os
+import math
+import json
+import time
+import random
+import hashlib
+import logging
+from contextlib import contextmanager
 import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from gspread.utils import ValueInputOption, ValueRenderOption, rowcol_to_a1
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+from master_merge import FIXED_COLUMNS, merge_master_frames, filled_cells
+from ticker_list import TickerList, content_hash
+from metric_cube import split_columns, split_frame, join_frame, rows_to_frame
+from instrumentation import stats
+import google_auth
+
+logger = logging.getLogger(__name__)
+
+LEASE_SHEET_TITLE = '_Lease'
+# Ticker List 체크섬 수식을 두는 내부용 시트 (A1 = 수식, B1 = 대상 시트 gid)
+SIGNATURE_SHEET_TITLE = '_TickerListSignature'
+# 티커 앞 몇 글자까지 체크섬에 반영할지
+SIGNATURE_CHARS = 12
+
+
+def ticker_signature_formula(sheet_title):
+    """
+    시트 A열의 가벼운 체크섬 수식: "값이 있는 셀 수:Σ(글자 코드 × 글자 위치 × 행 번호)"
+    Ticker List가 바뀔 때만 값이 바뀌므로 (Master Data/리스 쓰기와 무관) A열 전체 대신 이 셀 하나만 읽으면 됩니다.
+    해시가 아닌 가중합이라 충돌이 쉽습니다. (예: 같은 행의 "AC" -> "CB"는 둘 다 199)
+    그런 교체는 TICKER_LIST_MAX_AGE_HOURS가 지나 A열을 다시 읽을 때까지 놓칠 수 있으며, 보장하는 것은
+    "티커 추가/삭제/대부분의 교체를 한 셀 읽기로 감지"까지입니다.
+    오프라인 fake(benchmarks/fakes.py)는 이 수식 대신 CRC32로 계산하므로, 수식 자체는 실제 Sheets에서만 검증됩니다.
+    """
+    column = "'" + sheet_title.replace("'", "''") + "'!A:A"
+    positions = f"SEQUENCE(1,{SIGNATURE_CHARS})"
+    return (f'=COUNTA({column})&":"&SUMPRODUCT(IFERROR(UNICODE(MID({column},{positions},1)),0)'
+            f'*{positions}*ROW({column}))')
+
+
+class LeaseTimeout(Exception):
+    pass
+
+
+class SheetLease:
+    """
+    리스 시트의 A1:C1 = [보유자, 만료 시각(epoch), 버전]을 이용한 쓰기 리스.
+    Sheets에는 compare-and-swap이 없으므로, 비어 있거나 만료된 리스에 자신을 기록한 뒤
+    잠시 기다렸다 다시 읽어 여전히 자신일 때만 획득한 것으로 봅니다.
+    만료 시각이 있으므로 리스를 쥔 채 죽은 프로세스가 있어도 ttl 후 다른 샤드가 가져갑니다.
+    """
+
+    def __init__(self, worksheet, holder, ttl=None, timeout=None, settle=2.0):
+        self.worksheet = worksheet
+        self.holder = holder
+        self.ttl = float(ttl if ttl is not None else os.getenv("SHEETS_LEASE_TTL_SEC", "300"))
+        self.timeout = float(timeout if timeout is not None else os.getenv("SHEETS_LEASE_TIMEOUT_SEC", "600"))
+        self.settle = settle
+        self.version = 0
+
+    def _read(self):
+        stats.count('sheets.read_calls')
+        values = self.worksheet.get_values('A1:C1', value_render_option=ValueRenderOption.unformatted)
+        row = (values[0] if values else []) + ['', 0, 0]
+        holder, expires, version = row[:3]
+        return str(holder), float(expires or 0), int(version or 0)
+
+    def _write(self, holder, expires, version):
+        stats.count('sheets.write_calls')
+        self.worksheet.update([[holder, expires, version]], 'A1:C1')
+
+    def acquire(self):
+        deadline = time.time() + self.timeout
+        wait = 1.0
+        while True:
+            holder, expires, version = self._read()
+            if not holder or holder == self.holder or expires < time.time():
+                self.version = version + 1
+                self._write(self.holder, time.time() + self.ttl, self.version)
+                time.sleep(self.settle)
+                holder, _, version = self._read()
+                if holder == self.holder and version == self.version:
+                    logger.info(f"Acquired sheet lease as {self.holder} (version {self.version}).")
+                    return
+            if time.time() + wait > deadline:
+                raise LeaseTimeout(f"Could not acquire sheet lease (held by {holder}).")
+            stats.count('sheets.lease_waits')
+            time.sleep(wait + random.random())
+            wait = min(wait * 2, 30.0)
+
+    def release(self):
+        holder, _, version = self._read()
+        if holder == self.holder and version == self.version:
+            self._write('', 0, version)
+
+
+class MasterSnapshot:
+    """
+    한 세션 동안 공유하는 Master Data 시트 스냅샷.
+    시트 원본 그리드(셀마다 파이썬 객체)는 보관하지 않고 읽은 직후 다음 형태로 바꿔 둡니다.
+    - header / tickers: 헤더와 시트 행 순서의 티커 열 (셀 위치 계산, 구조 변경 확인용)
+    - fixed: 날짜 컬럼이 아닌 컬럼 (Last_Updated, Error_Log 등, 티커당 한 행)
+    - cube: 날짜 컬럼 값 (MetricCube, 티커 × 분기 × 항목 float64)
+    """
+
+    def __init__(self, header, tickers, fixed=None, cube=None, fetched_at=None):
+        # 시트에서 마지막으로 전체를 읽은 시각 (기록 후 갱신한 스냅샷은 원래 읽은 시각을 유지)
+        self.fetched_at = fetched_at or datetime.now()
+        self.header = list(header)
+        self.tickers = list(tickers)
+        self.checksum = _structure_checksum(self.header, self.tickers)
+        self.fixed = fixed
+        self.cube = cube
+
+    @classmethod
+    def from_grid(cls, grid, fetched_at=None):
+        """get_values(UNFORMATTED_VALUE) 결과(헤더 + 행)로 만듭니다."""
+        header = list(grid[0]) if grid else []
+        tickers = [str(row[0]).strip() if row else '' for row in grid[1:]]
+        if not header or header[0] != 'Ticker':
+            # 비정상 상태면 빈 스냅샷
+            return cls(header, tickers, fetched_at=fetched_at)
+
+        # 티커가 있는 행만, 같은 티커는 첫 행만 사용 (끝의 빈 셀은 API가 생략하므로 채움)
+        first_row = {}
+        for row, ticker in zip(grid[1:], tickers):
+            if ticker and ticker not in first_row:
+                first_row[ticker] = row
+        if not first_row:
+            return cls(header, tickers, fetched_at=fetched_at)
+        width = len(header)
+        values = np.full((len(first_row), width - 1), '', dtype=object)
+        for i, row in enumerate(first_row.values()):
+            row = row[1:width]
+            values[i, :len(row)] = row
+        fixed, cube = split_columns(list(first_row), header[1:], values)
+        return cls(header, tickers, fixed, cube, fetched_at=fetched_at)
+
+    @classmethod
+    def from_frame(cls, final_df, tickers, fetched_at=None):
+        """기록한 병합 결과(merge_master_frames)와 기록 후 시트 행 순서의 티커 열로 만듭니다."""
+        fixed, cube = split_frame(final_df.set_index('Ticker'))
+        return cls(final_df.columns, tickers, fixed, cube, fetched_at=fetched_at)
+
+    def frame(self):
+        """
+        Ticker 인덱스 wide DataFrame, 날짜 컬럼은 float64 (수정 금지).
+        큐브와 메모리를 이중으로 쓰지 않도록 캐시하지 않으므로, 호출부는 한 번 받아 재사용합니다.
+        """
+        if self.cube is None:
+            return pd.DataFrame()
+        return join_frame(self.fixed, self.cube)
+
+
 class SheetsClient:
-    def __init__(self, spreadsheet_id=None):
+    def __init__(self, spreadsheet_id=None, client=None, change_feed=None, ticker_cache=None, spreadsheet=None):
+        """
+        client: 이미 인증된 gspread 클라이언트 (벤치마크 등에서 대체 구현을 넣을 때 사용)
+        spreadsheet: 이미 연 스프레드시트 (google_auth.early_connection 결과, 주면 open_by_key 생략)
+        change_feed: 주어지면 Master Data에 새로 채워진 값을 기록할 ChangeFeed
+        ticker_cache: 주어지면 Ticker List 체크섬이 바뀌었을 때만 목록을 다시 읽도록 하는 TickerListCache
+        """
         self.spreadsheet_id = spreadsheet_id or os.getenv("SPREADSHEET_ID")
         self.credentials_path = os.getenv("GOOGLE_SHEETS_CREDENTIALS_PATH", "credentials.json")
         
         if not self.spreadsheet_id:
             raise ValueError("SPREADSHEET_ID is not set.")
             
-        self.scope = [
-            "https://spreadsheets.google.com/feeds",
-            "https://www.googleapis.com/auth/drive"
-        ]
-        self.client = self._authenticate()
-        self.spreadsheet = self.client.open_by_key(self.spreadsheet_id)
-
-    def _authenticate(self):
-        if not os.path.exists(self.credentials_path):
-             # JSON 내용을 환경변수에서 직접 읽는 로직은 복잡해지므로 일단 파일 경로 우선
-             # 실제 프로덕션(GitHub Actions)에서는 Secrets를 파일로 덤프해서 사용 예정
-             raise FileNotFoundError(f"Credentials file not found at: {self.credentials_path}")
-        
-        creds = ServiceAccountCredentials.from_json_keyfile_name(self.credentials_path, self.scope)
-        return gspread.authorize(creds)
+        self.client = client or google_auth.authorize(self.credentials_path)
+        self.spreadsheet = spreadsheet or self.client.open_by_key(self.spreadsheet_id)
+        # 세션 캐시: gid -> Worksheet, gid -> MasterSnapshot
+        self._worksheets = None
+        self._snapshots = {}
+        self.change_feed = change_feed
+        self.ticker_cache = ticker_cache
+        # 체크섬이 같아도 이 시간이 지나면 Ticker List를 다시 읽음
+        self.ticker_list_max_age = float(os.getenv("TICKER_LIST_MAX_AGE_HOURS", "24")) * 3600
 
     def get_worksheet_by_id(self, gid):
-        """GID를 사용하여 워크시트를 가져옵니다."""
-        for worksheet in self.spreadsheet.worksheets():
-            if str(worksheet.id) == str(gid):
-                return worksheet
+        """GID를 사용하여 워크시트를 가져옵니다. (세션 동안 핸들 캐시)"""
+        if self._worksheets is None or str(gid) not in self._worksheets:
+            # 처음이거나 새로 추가된 시트일 수 있으므로 메타데이터를 한 번만 다시 조회
+            stats.count('sheets.read_calls')
+            self._worksheets = {str(ws.id): ws for ws in self.spreadsheet.worksheets()}
+        if str(gid) in self._worksheets:
+            return self._worksheets[str(gid)]
         raise ValueError(f"Worksheet with GID {gid} not found.")
 
+    def _find_worksheet(self, title, refresh=False):
+        if refresh or self._worksheets is None:
+            stats.count('sheets.read_calls')
+            self._worksheets = {str(ws.id): ws for ws in self.spreadsheet.worksheets()}
+        for worksheet in self._worksheets.values():
+            if worksheet.title == title:
+                return worksheet
+        return None
+
+    def get_or_create_worksheet(self, title, rows=10, cols=5):
+        """제목으로 워크시트를 찾고, 없으면 만듭니다. (리스 등 내부용 시트)"""
+        worksheet = self._find_worksheet(title)
+        if worksheet is not None:
+            return worksheet
+        stats.count('sheets.write_calls')
+        try:
+            worksheet = self.spreadsheet.add_worksheet(title=title, rows=rows, cols=cols)
+        except gspread.exceptions.APIError:
+            # 다른 샤드가 같은 이름으로 먼저 만들었으면 이름 중복 에러 -> 목록을 다시 읽어 그 시트를 사용
+            worksheet = self._find_worksheet(title, refresh=True)
+            if worksheet is None:
+                raise
+            return worksheet
+        self._worksheets[str(worksheet.id)] = worksheet
+        return worksheet
+
+    @contextmanager
+    def lease(self, holder, ttl=None, timeout=None):
+        """
+        여러 프로세스(샤드)가 같은 시트에 쓸 때 쓰기 구간을 직렬화하는 리스.
+        사용 예: with sheets_client.lease("shard-0"): sheets_client.update_master_data(...)
+        """
+        lease = SheetLease(self.get_or_create_worksheet(LEASE_SHEET_TITLE), holder, ttl=ttl, timeout=timeout)
+        lease.acquire()
+        try:
+            yield lease
+        finally:
+            lease.release()
+
     def get_all_tickers(self, gid=0):
-        """Ticker List 시트(기본 gid=0)에서 모든 티커를 가져옵니다."""
+        """Ticker List 시트(기본 gid=0)에서 모든 티커를 시트 순서대로 가져옵니다."""
+        return self.get_ticker_list(gid).tickers
+
+    def get_ticker_list(self, gid=0):
+        """
+        Ticker List 시트의 티커 목록과 지난번 읽은 목록 대비 추가/삭제된 티커(TickerList).
+        ticker_cache가 있으면 A열 체크섬 셀(ticker_signature_formula)이 지난번과 같고
+        ticker_list_max_age가 지나지 않은 경우 A열을 다시 읽지 않고 캐시된 목록을 사용합니다.
+        체크섬은 Ticker List 시트만 반영하므로 Master Data 쓰기, 리스, 다른 샤드의 쓰기와 무관합니다.
+        """
+        if self.ticker_cache is None:
+            return TickerList(self._read_tickers(gid))
+
+        key = f"{self.spreadsheet_id}:{gid}"
+        cached = self.ticker_cache.load(key)
+        signature = self._ticker_signature(gid)
+        if (cached and signature and cached.get('signature') == signature
+                and time.time() - cached.get('fetched_at', 0) <= self.ticker_list_max_age):
+            stats.count('sheets.ticker_list_cached')
+            return TickerList(cached['tickers'], from_cache=True)
+
+        tickers = self._read_tickers(gid)
+        digest = content_hash(tickers)
+        added, removed = [], []
+        if cached and cached.get('hash') != digest:
+            previous, current = set(cached['tickers']), set(tickers)
+            added = [t for t in tickers if t not in previous]
+            removed = [t for t in cached['tickers'] if t not in current]
+        self.ticker_cache.save(key, {'signature': signature, 'hash': digest,
+                                     'fetched_at': time.time(), 'tickers': tickers})
+        return TickerList(tickers, added, removed)
+
+    def _read_tickers(self, gid):
         worksheet = self.get_worksheet_by_id(gid)
         # 첫 번째 컬럼을 티커 목록으로 가정
+        stats.count('sheets.read_calls')
         tickers = worksheet.col_values(1)
-        # 헤더가 있을 수 있으므로 첫 줄이 'Ticker' 같은 텍스트라면 제외하는 등의 로직 필요
-        # 여기서는 단순히 읽어오고 호출부에서 처리하도록 하거나, 
-        # Ticker List가 그냥 리스트만 있다고 가정
+        # 헤더가 있을 수 있으므로 첫 줄이 'Ticker' 같은 텍스트라면 제외
         if tickers and tickers[0].lower() == 'ticker':
             tickers = tickers[1:]
-        
-        # 빈 문자열 제거 및 중복 제거
-        return list(set([t.strip() for t in tickers if t.strip()]))
 
-    def get_master_data(self, gid=1101703314):
+        # 빈 문자열 제거 및 중복 제거 (시트 순서 유지)
+        return list(dict.fromkeys(t.strip() for t in tickers if t.strip()))
+
+    def _ticker_signature(self, gid):
+        """
+        Ticker List(gid) A열 체크섬 셀의 값. 체크섬 시트가 없거나 다른 시트를 가리키면 수식을 (다시) 씁니다.
+        읽기에 실패하거나 수식 에러면 None (이번에는 A열을 읽음)
+        """
+        try:
+            worksheet = self.get_or_create_worksheet(SIGNATURE_SHEET_TITLE)
+            value, target = self._read_signature(worksheet)
+            if target != str(gid) or not value:
+                formula = ticker_signature_formula(self.get_worksheet_by_id(gid).title)
+                stats.count('sheets.write_calls')
+                worksheet.update([[formula, str(gid)]], 'A1:B1', value_input_option=ValueInputOption.user_entered)
+                value, target = self._read_signature(worksheet)
+        except Exception as e:
+            logger.warning(f"Could not read Ticker List signature: {e}")
+            return None
+        if not value or value.startswith('#'):
+            logger.warning(f"Ticker List signature is not available ({value or 'empty'}).")
+            return None
+        return value
+
+    def _read_signature(self, worksheet):
+        stats.count('sheets.read_calls')
+        values = worksheet.get_values('A1:B1', value_render_option=ValueRenderOption.unformatted)
+        row = (values[0] if values else []) + ['', '']
+        return str(row[0]), str(row[1])
+
+    def load_master_snapshot(self, gid=1101703314, refresh=False, max_age=None):
+        """
+        Master Data를 원본 값(UNFORMATTED_VALUE)으로 한 번 읽어 세션 스냅샷으로 보관합니다.
+        max_age(초): 스냅샷이 이보다 오래됐으면 다시 읽음 (상주 모드)
+        """
+        if max_age is not None and gid in self._snapshots:
+            refresh = refresh or (datetime.now() - self._snapshots[gid].fetched_at).total_seconds() > max_age
+        if refresh or gid not in self._snapshots:
+            worksheet = self.get_worksheet_by_id(gid)
+            stats.count('sheets.read_calls')
+            grid = worksheet.get_values(value_render_option=ValueRenderOption.unformatted)
+            self._snapshots[gid] = MasterSnapshot.from_grid(grid)
+        return self._snapshots[gid]
+
+    def get_master_data(self, gid=1101703314, max_age=None):
         """Master Data 시트 데이터를 DataFrame으로 가져옵니다."""
-        worksheet = self.get_worksheet_by_id(gid)
-        data = worksheet.get_all_records()
-        df = pd.DataFrame(data)
-        
+        df = self.load_master_snapshot(gid, max_age=max_age).frame()
+
         # 필수 컬럼이 없는 빈 시트인 경우 처리
-        if df.empty and 'Ticker' not in df.columns:
+        if df.empty:
             # 컬럼 정의 (빈 프레임) - 여기서는 최소한의 고정 컬럼만 반환
-            columns = ['Ticker', 'Last_Updated', 'Error_Log']
+            columns = ['Ticker'] + FIXED_COLUMNS
             return pd.DataFrame(columns=columns)
-            
-        return df
 
-    def update_master_data(self, new_data_list, gid=1101703314):
+        return df.reset_index()
+
+    def _snapshot_changed(self, worksheet, snapshot):
+        """
+        스냅샷 이후 시트 구조(헤더/티커 열)가 바뀌었는지 확인합니다.
+        전체를 다시 읽는 대신 1행과 A열만 한 번의 batch_get으로 비교합니다.
+        """
+        stats.count('sheets.read_calls')
+        header_range, ticker_range = worksheet.batch_get(
+            ['1:1', 'A:A'], value_render_option=ValueRenderOption.unformatted
+        )
+        header = list(header_range[0]) if header_range else []
+        tickers = [str(row[0]).strip() if row else '' for row in ticker_range[1:]]
+        return _structure_checksum(header, tickers) != snapshot.checksum
+
+    def update_master_data(self, new_data_list, gid=1101703314, mode=None, min_period=None):
         """
         Master Data 시트를 업데이트합니다. (동적 컬럼 방식)
+        mode='incremental'(기본): 바뀐 셀/새 행/새 날짜 컬럼만 기록
+        mode='full': 기존 방식 (clear() 후 전체 재작성)
+        min_period('YYYY-MM-DD'): 주어지면 이보다 오래된 날짜 컬럼은 시트에서 제거 (최근 N분기 뷰)
+        change_feed가 있으면 기록이 성공한 뒤 새로 채워진 셀(새 분기, 0 -> 값)을 변경 기록에 추가
         """
-        worksheet = self.get_worksheet_by_id(gid)
-        
-        # 1. 기존 데이터 로드
-        existing_records = worksheet.get_all_records()
-        if existing_records:
-            df_old = pd.DataFrame(existing_records)
-            # Ticker 컬럼이 있는지 확인
-            if 'Ticker' in df_old.columns:
-                df_old.set_index('Ticker', inplace=True)
-            else:
-                 # 비정상 상태면 초기화
-                 df_old = pd.DataFrame()
-        else:
-            df_old = pd.DataFrame()
-
-        # 2. 새로운 데이터 준비
-        df_new = pd.DataFrame(new_data_list)
-        if df_new.empty:
+        mode = mode or os.getenv("SHEETS_WRITE_MODE", "incremental")
+
+        # 2. 새로운 데이터 준비 (날짜 값은 MetricCube를 거쳐 float64 컬럼으로)
+        if not new_data_list:
             return
-        df_new.set_index('Ticker', inplace=True)
+        df_new = rows_to_frame(new_data_list)
+
+        worksheet = self.get_worksheet_by_id(gid)
+
+        # 1. 기존 데이터: 이번 세션 스냅샷 재사용 (없으면 읽기)
+        #    스냅샷 이후 행/열 구조가 바뀌었다면 셀 위치가 어긋나므로 다시 읽음
+        if gid in self._snapshots and self._snapshot_changed(worksheet, self._snapshots[gid]):
+            logger.warning("Master Data changed since snapshot. Re-reading sheet.")
+            self.load_master_snapshot(gid, refresh=True)
+        snapshot = self.load_master_snapshot(gid)
+
+        # 3~4. 컬럼 통합 및 데이터 병합
+        old_df = snapshot.frame()
+        with stats.stage('merge'):
+            final_df = merge_master_frames(old_df, df_new, min_period=min_period)
+
+        # 5. 저장 후 스냅샷을 기록한 내용으로 교체 (재조회 불필요)
+        row_tickers = None
+        if mode == 'incremental':
+            row_tickers = self._write_incremental(worksheet, snapshot, old_df, final_df, set(df_new.index))
+            if row_tickers is None:
+                # 전체 재작성은 다른 작성자(다른 샤드, 사람)의 변경까지 덮어쓰므로 최신 값으로 다시 병합
+                logger.warning("Incremental write not possible. Re-reading sheet for a full rewrite.")
+                snapshot = self.load_master_snapshot(gid, refresh=True)
+                old_df = snapshot.frame()
+                final_df = merge_master_frames(old_df, df_new, min_period=min_period)
+        if row_tickers is None:
+            row_tickers = self._write_full(worksheet, final_df)
+
+        # 6. 변경 기록: 실제로 시트에 반영된 병합 결과와 병합 전 스냅샷을 비교
+        if self.change_feed is not None:
+            recorded = self.change_feed.append(filled_cells(old_df, final_df, set(df_new.index)))
+            stats.count('changes.recorded', recorded)
+        self._snapshots[gid] = MasterSnapshot.from_frame(final_df, row_tickers, fetched_at=snapshot.fetched_at)
+
+    def _write_full(self, worksheet, final_df):
+        """시트를 비우고 전체를 다시 씁니다. 기록 후 시트 행 순서의 티커 열을 반환합니다."""
+        data_to_write = [final_df.columns.tolist()] + [
+            [_cell(v) for v in row] for row in final_df.values.tolist()
+        ]
 
-        # 3. 컬럼 통합 (동적 컬럼)
-        # 고정 컬럼
-        fixed_cols = ['Last_Updated', 'Error_Log']
-        
-        # 동적 컬럼 (Rev_, EPS_, YoY_ 로 시작하는 것들) 추출
-        # df_old와 df_new의 모든 컬럼을 합침
-        all_cols = set()
-        if not df_old.empty:
-            all_cols.update(df_old.columns)
-        all_cols.update(df_new.columns)
-        
-        # 날짜 컬럼만 필터링 및 정렬
-        date_cols = [c for c in all_cols if c not in fixed_cols and c != 'Ticker']
-        
-        # 정렬 로직: 날짜 부분(YYYY-MM-DD)을 추출해서 내림차순(최신이 왼쪽) 정렬
-        # 예: Rev_2025-12-31 -> 2025-12-31
-        def sort_key(col_name):
-            # 접두사 분리 (Rev_, EPS_, YoY_Rev_, YoY_EPS_)
-            # 단순히 뒤에서 10자리(YYYY-MM-DD) 추출
-            if len(col_name) >= 10:
-                date_part = col_name[-10:]
-                prefix = col_name[:-10]
-                # 정렬 우선순위: 날짜(내림차순) -> 항목(Revenue, EPS, YoY...)
-                return (date_part, prefix)
-            return ("", col_name)
-
-        # 복합 정렬: 날짜 내림차순
-        date_cols.sort(key=lambda x: sort_key(x), reverse=True)
-
-        # 최종 컬럼 순서: Ticker(인덱스) + Fixed + Dynamic(Sorted)
-        # Last_Updated는 맨 앞에, Error_Log는 맨 뒤에
-        final_column_order = ['Last_Updated'] + date_cols + ['Error_Log']
-        
-        # 4. 데이터 병합
-        if df_old.empty:
-            final_df = df_new
-        else:
-            # 먼저 인덱스 합치기
-            all_index = df_old.index.union(df_new.index)
-            final_df = pd.DataFrame(index=all_index)
-            
-            # 각 컬럼별로 처리
-            for col in final_column_order:
-                old_series = df_old[col] if col in df_old.columns else pd.Series(index=all_index)
-                new_series = df_new[col] if col in df_new.columns else pd.Series(index=all_index)
-                
-                # 병합 로직: Old 값 우선, 단 Old가 0/NaN/Empty면 New 값 사용
-                merged = old_series.copy()
-                
-                # reindex
-                merged = merged.reindex(all_index)
-                new_val = new_series.reindex(all_index)
-                
-                # 마스크 생성: (isna) | (== 0) | (== '')
-                # 숫자 변환 시도 (문자열 빈칸 처리 위해)
-                merged_numeric = pd.to_numeric(merged, errors='coerce').fillna(0)
-                
-                # Last_Updated는 무조건 New가 있으면 New로
-                if col == 'Last_Updated':
-                     final_df[col] = new_val.combine_first(merged)
-                else:
-                    # 일반 데이터: 0인 곳만 update
-                    update_mask = (merged_numeric == 0)
-                    # where(cond, other): cond가 True면 유지, False면 other 사용
-                    # 우리는 mask가 True(0임)일 때 new_val을 쓰고 싶음 -> cond는 ~mask
-                    final_df[col] = merged.where(~update_mask, new_val)
-
-        # 5. 마무리 및 저장
-        final_df.fillna('', inplace=True) # NaN -> 빈 문자열 (0대신 깔끔하게)
-        final_df.reset_index(inplace=True) # Ticker 복구
-        
-        # 컬럼 순서 강제 적용 (없는 컬럼은 빈 값으로 추가)
-        for col in final_column_order:
-            if col not in final_df.columns:
-                final_df[col] = ''
-                
-        # Ticker + final_column_order
-        final_output_cols = ['Ticker'] + final_column_order
-        final_df = final_df[final_output_cols]
-        
-        # 값 리스트 변환 (NaN 방지)
-        final_df = final_df.fillna('')
-        
-        data_to_write = [final_df.columns.tolist()] + final_df.values.tolist()
-        
         worksheet.clear()
         worksheet.update(data_to_write)
+        stats.count('sheets.write_calls', 2)
+        stats.count('sheets.cells_written', sum(len(row) for row in data_to_write))
+        return final_df['Ticker'].tolist()
+
+    def _write_incremental(self, worksheet, snapshot, old_df, final_df, touched):
+        """
+        기존 스냅샷과 비교해 바뀐 부분만 기록합니다.
+        - 창 밖으로 밀려난 날짜 컬럼: 연속 구간마다 delete_columns 1회
+        - 새 날짜 컬럼: 연속 구간마다 insert_cols 1회
+        - 새 티커: 기존 행 아래에 추가
+        - 값 변경: 모든 변경 구간을 batch_update 1회로 전송
+        병합 결과가 바뀔 수 있는 행은 이번에 수집한 티커(touched)뿐이므로 그 행만 기존 값(old_df = snapshot.frame())과 비교합니다.
+        기록 후 시트 행 순서의 티커 열을 반환합니다. 기존 헤더 순서를 유지할 수 없는 경우
+        (수동 편집 등) None을 반환하며, 호출부는 전체 재작성으로 대체합니다.
+        """
+        old_header = snapshot.header
+        new_header = final_df.columns.tolist()
+
+        if not old_header or old_header[0] != 'Ticker' or '' in old_header:
+            return None
+        new_set = set(new_header)
+        kept_header = [name for name in old_header if name in new_set]
+        if not _is_subsequence(kept_header, new_header):
+            return None
+
+        # 기존 티커의 시트 행 번호 (1-based, 헤더가 1행)
+        row_of = {}
+        for i, ticker in enumerate(snapshot.tickers):
+            if ticker and ticker not in row_of:
+                row_of[ticker] = i + 2
+
+        # 0) 제거할 컬럼 삭제: 오른쪽부터 처리해야 앞쪽 위치가 바뀌지 않음
+        j = len(old_header) - 1
+        while j >= 0:
+            if old_header[j] in new_set:
+                j -= 1
+                continue
+            run_end = j
+            while j >= 0 and old_header[j] not in new_set:
+                j -= 1
+            worksheet.delete_columns(j + 2, run_end + 1)
+            stats.count('sheets.write_calls')
+
+        # 1) 새 컬럼 삽입: 왼쪽부터 처리하면 삽입 위치 j가 곧 최종 위치
+        #    맨 오른쪽에 붙는 컬럼은 삽입 대신 헤더 셀만 기록 (필요하면 add_cols)
+        updates = []
+        old_set = set(kept_header)
+        width = len(kept_header)
+        j = 0
+        while j < len(new_header):
+            if new_header[j] in old_set:
+                j += 1
+                continue
+            run_start = j
+            while j < len(new_header) and new_header[j] not in old_set:
+                j += 1
+            if run_start >= width:
+                updates.extend(_contiguous_ranges(1, list(range(run_start, j)), new_header))
+            else:
+                worksheet.insert_cols([[name] for name in new_header[run_start:j]], col=run_start + 1)
+                stats.count('sheets.write_calls')
+                stats.count('sheets.cells_written', j - run_start)
+            width += j - run_start
+
+        # 2) 셀 단위 변경 계산: 기존 값은 스냅샷에서 이번에 수집한 티커 행만 새 헤더 순서로 꺼냄
+        row_tickers = list(snapshot.tickers)
+        next_row = len(row_tickers) + 2
+        touched_df = final_df[final_df['Ticker'].isin(touched)]
+        existing = [t for t in touched_df['Ticker'] if t in row_of]
+        old_rows = dict(zip(existing, old_df.reindex(index=existing, columns=new_header[1:])
+                            .values.tolist()))
+        for values in touched_df.values.tolist():
+            values = [_cell(v) for v in values]
+            ticker = values[0]
+            if ticker in row_of:
+                r = row_of[ticker]
+                old_row = [ticker] + old_rows[ticker]
+                changed = [c for c in range(len(new_header)) if not _same_value(_cell(old_row[c]), values[c])]
+            else:
+                r = next_row
+                next_row += 1
+                row_tickers.append(ticker)
+                changed = [c for c, v in enumerate(values) if v != '']
+            updates.extend(_contiguous_ranges(r, changed, values))
+
+        if not updates:
+            return row_tickers
+
+        # 3) 새 티커 행/오른쪽 컬럼이 시트 크기를 넘으면 행/열 추가
+        needed_rows = next_row - 1
+        if needed_rows > worksheet.row_count:
+            worksheet.add_rows(needed_rows - worksheet.row_count)
+            stats.count('sheets.write_calls')
+        if len(new_header) > worksheet.col_count:
+            worksheet.add_cols(len(new_header) - worksheet.col_count)
+            stats.count('sheets.write_calls')
+
+        worksheet.batch_update(updates)
+        stats.count('sheets.write_calls')
+        stats.count('sheets.cells_written', sum(len(u['values'][0]) for u in updates))
+        return row_tickers
+
+
+def _rstrip(values):
+    """시트 API는 끝부분의 빈 셀을 돌려주지 않으므로 비교 전에 제거합니다."""
+    values = list(values)
+    while values and values[-1] == '':
+        values.pop()
+    return values
+
+
+def _structure_checksum(header, tickers):
+    """헤더와 티커 열(행 위치)의 해시. 셀 위치가 바뀌었는지 판별하는 데 사용합니다."""
+    payload = json.dumps([_rstrip(header), _rstrip(tickers)], default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _cell(value):
+    """numpy 스칼라/NaN을 시트에 쓸 수 있는 파이썬 값으로 변환합니다."""
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return ''
+    return value
+
+
+def _same_value(old, new):
+    """시트의 기존 값과 새 값이 같은지 비교합니다. (숫자는 값으로 비교)"""
+    if old == '' or new == '':
+        return old == new
+    try:
+        return float(old) == float(new)
+    except (TypeError, ValueError):
+        return str(old) == str(new)
+
+
+def _is_subsequence(short, long):
+    it = iter(long)
+    return all(name in it for name in short)
+
+
+def _contiguous_ranges(row, cols, values):
+    """한 행에서 바뀐 컬럼들을 연속 구간별 batch_update 항목으로 묶습니다."""
+    ranges = []
+    start = None
+    for k, c in enumerate(cols):
+        if start is None:
+            start = c
+        if k + 1 == len(cols) or cols[k + 1] != c + 1:
+            ranges.append({
+                'range': f"{rowcol_to_a1(row, start + 1)}:{rowcol_to_a1(row, c + 1)}",
+                'values': [[_cell(v) for v in values[start:c + 1]]],
+            })
+            start = None
+    return ranges
@@ -0,0 +1,61 @@
+import os
+import json
+import hashlib
+import threading
+
+
+class TickerList:
+    """
+    Ticker List 시트 읽기 결과.
+    - tickers: 시트 순서를 유지한 중복 없는 티커 목록
+    - added / removed: 지난번에 읽은 목록 대비 추가/삭제된 티커 (이전 기록이 없으면 빈 목록)
+    - from_cache: 시트를 읽지 않고 로컬 캐시를 사용했는지 여부
+    """
+
+    def __init__(self, tickers, added=None, removed=None, from_cache=False):
+        self.tickers = tickers
+        self.added = added or []
+        self.removed = removed or []
+        self.from_cache = from_cache
+
+
+def content_hash(tickers):
+    return hashlib.sha1('\n'.join(tickers).encode('utf-8')).hexdigest()
+
+
+class TickerListCache:
+    """
+    마지막으로 읽은 Ticker List를 A열 체크섬 셀 값과 함께 보관하는 로컬 JSON 파일.
+    키 = "스프레드시트ID:gid", 값 = {"signature", "hash", "fetched_at", "tickers"}
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("TICKER_LIST_CACHE_PATH", ".cache/ticker_list.json")
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _read_all(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except ValueError:
+            # 쓰는 도중 죽어서 깨진 파일
+            return {}
+
+    def load(self, key):
+        with self._lock:
+            return self._read_all().get(key)
+
+    def save(self, key, entry):
+        """항목을 교체합니다. (임시 파일 + rename으로 원자적 교체)"""
+        with self._lock:
+            entries = self._read_all()
+            entries[key] = entry
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp, self.path)
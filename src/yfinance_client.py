@@ -1,80 +1,234 @@
-import yfinance as yf
+import os
+import re
+import time
+import threading
+import numpy as np
 import pandas as pd
-import math
 
-class YFinanceClient:
-    def __init__(self):
+from master_merge import ANNUAL_PREFIX, to_numeric_frame
+from providers import FinancialsProvider
+from instrumentation import stats
+
+# 수집 항목 정의: 컬럼 접두사 -> 우선순위 순 후보 행, 0을 빈 값으로 보고 다음 후보로 넘어갈지 여부
+METRIC_SPECS = {
+    # 대부분 기업: Total Revenue / 은행·금융: Operating Revenue 또는 Interest Income 등
+    'Rev': {'rows': ['Total Revenue', 'Operating Revenue', 'Total Operating Income', 'Interest Income'],
+            'skip_zero': True},
+    'EPS': {'rows': ['Diluted EPS', 'Basic EPS'], 'skip_zero': False},
+    'NI': {'rows': ['Net Income', 'Net Income Common Stockholders'], 'skip_zero': False},
+    'OpInc': {'rows': ['Operating Income', 'Total Operating Income As Reported'], 'skip_zero': False},
+}
+DEFAULT_METRICS = ['Rev', 'EPS']
+
+
+def is_rate_limit_error(e):
+    """Yahoo의 429(Too Many Requests) 응답인지 판별합니다."""
+    if type(e).__name__ == 'YFRateLimitError':
+        return True
+    return is_rate_limit_message(str(e))
+
+
+def is_rate_limit_message(message):
+    """에러 메시지(또는 Error_Log 문자열)가 Rate Limit을 나타내는지 판별합니다."""
+    msg = message.lower()
+    return '429' in msg or 'too many requests' in msg or 'rate limit' in msg
+
+
+NETWORK_ERROR_PREFIX = 'Network Error'
+NO_DATA_ERROR = 'No Data (Empty DataFrame)'
+_SERVER_ERROR = re.compile(r'\b50[0-4]\b|service unavailable|bad gateway|gateway time-?out|timed out')
+
+
+def is_transport_error(e):
+    """연결 실패/타임아웃/5xx 등 Yahoo 쪽 장애인지 판별합니다. (티커 문제가 아님)"""
+    # requests/curl_cffi의 연결 예외도 OSError 하위 클래스
+    return isinstance(e, OSError) or is_transport_message(str(e))
+
+
+def is_transport_message(message):
+    """에러 메시지(또는 Error_Log 문자열)가 네트워크/서버 장애를 나타내는지 판별합니다."""
+    return message.startswith(NETWORK_ERROR_PREFIX) or bool(_SERVER_ERROR.search(message.lower()))
+
+
+def preload():
+    """
+    yfinance는 import에만 수백 ms가 걸리므로 실제 요청 직전에 import합니다.
+    시작 시 이 함수를 부르면 시트 읽기(네트워크 대기)와 겹치도록 백그라운드 스레드에서 미리 import합니다.
+    """
+    thread = threading.Thread(target=_import_yfinance, name='yfinance-preload', daemon=True)
+    thread.start()
+    return thread
+
+
+def _import_yfinance():
+    import yfinance
+    return yfinance
+
+
+def make_session():
+    """
+    여러 Ticker 요청이 공유할 keep-alive HTTP 세션 (상주 모드용).
+    yfinance는 curl_cffi 세션만 받으므로, curl_cffi가 없으면 None(yfinance 기본 세션)을 반환합니다.
+    """
+    try:
+        from curl_cffi import requests as curl_requests
+    except ImportError:
+        return None
+    return curl_requests.Session(impersonate="chrome")
+
+
+class YFinanceClient(FinancialsProvider):
+    name = 'yahoo'
+
+    def __init__(self, cache=None, metrics=None, session=None):
         # API Key 불필요
-        pass
+        # cache: FinancialsCache (선택). 있으면 quarterly_financials 원본을 로컬에 보관/재사용
+        self.cache = cache
+        # session: 모든 yf.Ticker가 공유할 HTTP 세션 (선택, make_session 참고)
+        self.session = session
+        # metrics: 수집할 METRIC_SPECS 키 목록 (기본: 환경변수 METRICS 또는 Rev, EPS)
+        if metrics is None:
+            metrics = [m.strip() for m in os.getenv("METRICS", ",".join(DEFAULT_METRICS)).split(",") if m.strip()]
+        unknown = [m for m in metrics if m not in METRIC_SPECS]
+        if unknown:
+            raise ValueError(f"Unknown metrics: {unknown}. Available: {list(METRIC_SPECS)}")
+        self.metrics = metrics
+
+    def is_cached(self, ticker_symbol):
+        """네트워크 요청 없이 캐시로 응답할 수 있는지 여부"""
+        return self.cache is not None and self.cache.has_fresh(ticker_symbol)
 
-    def get_financials(self, ticker_symbol):
+    def request_cost(self, ticker_symbol, include_annual=False):
+        """
+        get_financials가 보낼 Yahoo 요청 수. 캐시로 응답하면 0,
+        분기 재무제표를 받으면 1 + (실적 발표일 캐시가 오래됐으면 calendar 요청 1),
+        include_annual이면 연간 재무제표 요청 1 추가
+        """
+        if self.is_cached(ticker_symbol):
+            cost = 0
+        else:
+            cost = 1
+            if self.cache is not None and self.cache.calendar_is_stale(ticker_symbol):
+                cost += 1
+        if include_annual:
+            cost += 1
+        return cost
+
+    def _ticker(self, ticker_symbol):
+        yf = _import_yfinance()
+        if self.session is not None:
+            return yf.Ticker(ticker_symbol, session=self.session)
+        return yf.Ticker(ticker_symbol)
+
+    def _get_quarterly_financials(self, ticker_symbol, ticker=None):
+        """quarterly_financials를 캐시 우선으로 가져옵니다."""
+        if self.cache is not None:
+            qf = self.cache.get_fresh(ticker_symbol)
+            if qf is not None:
+                stats.count('yahoo.cache_hits')
+                return qf
+
+        start = time.perf_counter()
+        ticker = ticker or self._ticker(ticker_symbol)
+        try:
+            qf = ticker.quarterly_financials
+        finally:
+            stats.count('yahoo.requests')
+            stats.observe('yahoo.request_seconds', time.perf_counter() - start)
+
+        if self.cache is not None:
+            self.cache.put(ticker_symbol, qf)
+            # 같은 Ticker 객체로 실적 발표일도 갱신 (스케줄러용, calendar_ttl_days 주기)
+            if self.cache.calendar_is_stale(ticker_symbol):
+                self.cache.put_earnings_date(ticker_symbol, self._get_earnings_date(ticker))
+        return qf
+
+    def _get_earnings_date(self, ticker):
+        """yfinance calendar에서 다음(또는 직전) 실적 발표일을 'YYYY-MM-DD'로 반환합니다."""
+        stats.count('yahoo.requests')
+        try:
+            calendar = ticker.calendar
+        except Exception as e:
+            if is_rate_limit_error(e):
+                raise
+            return None
+        if not isinstance(calendar, dict):
+            return None
+        dates = calendar.get('Earnings Date') or []
+        if not dates:
+            return None
+        return pd.Timestamp(dates[0]).strftime('%Y-%m-%d')
+
+    def _get_annual_financials(self, ticker):
+        """연간 재무제표 (캐시하지 않음, 신규 티커 backfill 때만 사용)"""
+        start = time.perf_counter()
+        try:
+            return ticker.financials
+        finally:
+            stats.count('yahoo.requests')
+            stats.observe('yahoo.request_seconds', time.perf_counter() - start)
+
+    def get_financials(self, ticker_symbol, include_annual=False):
         """
         특정 티커의 분기별 재무 데이터를 가져옵니다. (동적 날짜 컬럼)
-        Revenue: Total Revenue
-        EPS: Diluted EPS
+        수집 항목은 self.metrics (METRIC_SPECS 참고), 키 포맷: {접두사}_YYYY-MM-DD
+        include_annual=True(backfill bulk 모드)이면 같은 Ticker 세션으로 연간 재무제표도 받아
+        FY_{접두사}_YYYY-MM-DD 키로 함께 반환합니다. (로컬 저장소 전용, 시트에는 쓰지 않음)
         """
         try:
-            ticker = yf.Ticker(ticker_symbol)
             # quarterly_financials 가져오기 (Index: 항목명, Columns: 날짜)
-            qf = ticker.quarterly_financials
-            
+            ticker = self._ticker(ticker_symbol) if include_annual else None
+            qf = self._get_quarterly_financials(ticker_symbol, ticker)
+
             # DataFrame이 비어있으면 None 반환
             if qf.empty:
                 return None
-                
-            # 데이터 전처리: 날짜 내림차순 정렬 (최신이 왼쪽/0번 인덱스)
-            sorted_cols = sorted(qf.columns, reverse=True)
-            qf = qf[sorted_cols]
-            
-            # 반환할 결과 딕셔너리
-            result = {}
-            
-            # 모든 분기 데이터 순회
-            for date_col in qf.columns:
-                # 날짜 포맷 (YYYY-MM-DD)
-                date_str = date_col.strftime('%Y-%m-%d')
-                
-                # Revenue Logic (Financial Sector Fallback)
-                # 대부분 기업: Total Revenue
-                # 은행/금융: Operating Revenue 또는 Interest Income 등
-                rev = 0
-                revenue_keys = ['Total Revenue', 'Operating Revenue', 'Total Operating Income', 'Interest Income']
-                
-                for key in revenue_keys:
-                    try:
-                        val = qf.loc[key, date_col]
-                        if not pd.isna(val) and val != 0:
-                            rev = val
-                            break
-                    except KeyError:
-                        continue
-                
-                if pd.isna(rev): rev = 0
-                
-                # EPS
-                try:
-                    eps = qf.loc['Diluted EPS', date_col]
-                    if pd.isna(eps): eps = 0.0
-                except KeyError:
-                    try:
-                        eps = qf.loc['Basic EPS', date_col]
-                        if pd.isna(eps): eps = 0.0
-                    except KeyError:
-                        eps = 0.0
-                
-                # 키 포맷: Rev_YYYY-MM-DD, EPS_YYYY-MM-DD
-                result[f'Rev_{date_str}'] = float(rev)
-                result[f'EPS_{date_str}'] = float(eps)
-                
-            # YoY 성장률 계산 로직 제거 (User Request)
-            # Revenue, EPS 데이터만 반환합니다.
 
+            # YoY 성장률 계산 로직 제거 (User Request)
+            result = extract_metrics(qf, self.metrics)
+            if include_annual:
+                af = self._get_annual_financials(ticker)
+                if af is not None and not af.empty:
+                    annual = extract_metrics(af, self.metrics)
+                    result.update({ANNUAL_PREFIX + k: v for k, v in annual.items()})
             return result
 
         except Exception as e:
+            # Rate Limit/네트워크 장애는 호출부(FetchEngine)가 백오프·서킷 브레이커로 처리하도록 그대로 전달
+            if is_rate_limit_error(e) or is_transport_error(e):
+                raise
             print(f"Error fetching data for {ticker_symbol}: {e}")
             return None
 
+
+def extract_metrics(qf, metrics=DEFAULT_METRICS):
+    """
+    재무제표 프레임(Index: 항목명, Columns: 날짜)에서 모든 분기의 항목 값을 한 번에 추출합니다.
+    후보 행 전체를 한 번 reindex한 뒤, 항목마다 우선순위 순 후보 행에서 분기별로
+    "값이 있는 첫 번째 행"을 numpy로 고릅니다. (행 방향 bfill의 첫 행과 같음)
+    모든 후보가 비어 있으면 0.
+    """
+    # 날짜 내림차순 정렬 (최신이 왼쪽/0번 인덱스)
+    qf = qf[sorted(qf.columns, reverse=True)]
+    dates = [d.strftime('%Y-%m-%d') for d in qf.columns]
+
+    rows = list(dict.fromkeys(row for name in metrics for row in METRIC_SPECS[name]['rows']))
+    candidates = to_numeric_frame(qf.reindex(rows)).to_numpy()
+    position = {row: i for i, row in enumerate(rows)}
+    quarters = np.arange(len(dates))
+
+    result = {}
+    for name in metrics:
+        spec = METRIC_SPECS[name]
+        block = candidates[[position[row] for row in spec['rows']]]
+        valid = ~np.isnan(block)
+        if spec['skip_zero']:
+            valid &= block != 0
+        values = np.where(valid.any(axis=0), block[valid.argmax(axis=0), quarters], 0.0)
+        result.update(zip((f'{name}_{d}' for d in dates), values.tolist()))
+    return result
+
+
 if __name__ == "__main__":
     client = YFinanceClient()
     print(client.get_financials("AAPL"))
@@ -0,0 +1,114 @@
+"""
+FetchEngine / FailureTracker 오프라인 테스트 (benchmarks/fakes.py의 yf.Ticker 대체 구현 사용)
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+from unittest import mock
+
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import fakes  # noqa: E402
+from fetch_engine import FetchEngine  # noqa: E402
+from scheduler import FailureTracker  # noqa: E402
+from yfinance_client import YFinanceClient, NETWORK_ERROR_PREFIX  # noqa: E402
+
+
+class DeadTickerFactory(fakes.FakeTickerFactory):
+    """dead에 속한 티커는 빈 프레임(상장폐지 등), 나머지는 정상 재무제표"""
+
+    def __init__(self, dead, **kwargs):
+        super().__init__(**kwargs)
+        self.dead = set(dead)
+        self.fetched = []
+
+    def __call__(self, symbol, session=None):
+        self.fetched.append(symbol)
+        if symbol in self.dead:
+            return mock.Mock(quarterly_financials=pd.DataFrame())
+        return super().__call__(symbol, session)
+
+
+def make_engine(**kwargs):
+    engine = FetchEngine(YFinanceClient(), workers=2, rate=1000, backoff_base=0.001, **kwargs)
+    # 연속 빈 응답 감속이 테스트를 느리게 하지 않도록
+    engine.bucket.min_rate = 500
+    return engine
+
+
+def run_tracked(engine, tickers):
+    tracker = FailureTracker(pd.DataFrame())
+    rows = []
+    engine.run(tickers, on_result=lambda row: rows.append(tracker.apply(row, transient=engine.breaker.degraded)))
+    return {row['Ticker']: row for row in rows}
+
+
+def test_dead_ticker_block_does_not_trip_breaker():
+    # 점수가 같은 죽은 티커들이 큐 앞에 몰려 있는 경우
+    dead = [f'D{i:03d}' for i in range(100)]
+    healthy = [f'H{i:03d}' for i in range(50)]
+    factory = DeadTickerFactory(dead)
+    engine = make_engine()
+    with mock.patch('yfinance.Ticker', factory):
+        rows = run_tracked(engine, dead + healthy)
+
+    assert engine.breaker.trips == 0
+    assert len(rows) == 150
+    assert all(rows[t]['Fail_Count'] == 1 and rows[t]['Next_Retry'] for t in dead)
+    assert all(not rows[t]['Error_Log'] and rows[t]['Fail_Count'] == '' for t in healthy)
+
+
+def test_outage_trips_breaker_without_charging_tickers():
+    class Down:
+        def __init__(self, symbol, session=None):
+            pass
+
+        @property
+        def quarterly_financials(self):
+            raise ConnectionError("503 Server Error: Service Unavailable")
+
+    with mock.patch.dict(os.environ, {'BREAKER_COOLDOWN_SEC': '0.01'}):
+        engine = make_engine()
+    with mock.patch('yfinance.Ticker', Down):
+        rows = run_tracked(engine, [f'T{i:03d}' for i in range(30)])
+
+    assert engine.breaker.trips >= 1
+    assert all(row['Error_Log'].startswith(NETWORK_ERROR_PREFIX) for row in rows.values())
+    assert all(row['Fail_Count'] == '' for row in rows.values())
+
+
+def test_http_429_is_retried_as_rate_limit():
+    import requests
+
+    calls = []
+
+    class Throttled(fakes.FakeTicker):
+        @property
+        def quarterly_financials(self):
+            calls.append(self.ticker)
+            if len(calls) == 1:
+                raise requests.HTTPError("429 Client Error: Too Many Requests")
+            return fakes.make_statement()
+
+    factory = fakes.FakeTickerFactory()
+    engine = make_engine()
+    with mock.patch('yfinance.Ticker', lambda symbol, session=None: Throttled(factory, symbol)):
+        rows = engine.run(['AAA'])
+
+    assert len(calls) == 2
+    assert rows[0]['Error_Log'] == ''
+
+
+def test_penalize_does_not_accrue_tokens_while_paused():
+    from fetch_engine import TokenBucket
+
+    bucket = TokenBucket(rate=100, burst=5)
+    bucket.penalize(pause=0.2)
+    bucket.acquire()
+    # 재개 직후에는 쌓인 토큰이 없어야 함 (멈춘 0.2초 동안 20개가 쌓이면 burst 5개가 바로 나감)
+    assert bucket._tokens < 1.0
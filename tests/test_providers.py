@@ -0,0 +1,21 @@
+"""
+providers / FMPClient 오프라인 테스트
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from fmp_client import FMPClient  # noqa: E402
+from providers import HedgedProvider  # noqa: E402
+from yfinance_client import YFinanceClient  # noqa: E402
+
+
+def test_fmp_quota_resets_every_cycle():
+    fmp = FMPClient(api_key='test', max_requests=2)
+    provider = HedgedProvider(YFinanceClient(), fmp)
+    for _ in range(3):
+        provider.start_cycle()
+        assert [fmp._reserve_request() for _ in range(3)] == [True, True, False]
@@ -0,0 +1,30 @@
+"""
+scheduler 오프라인 테스트
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from scheduler import expected_report_date, new_data_scores  # noqa: E402
+
+
+def test_calendar_date_of_collected_quarter_is_ignored():
+    # 2026-03-31 분기는 이미 수집했고, calendar는 그 분기의 발표일(2026-04-30)을 가리킴
+    master = pd.DataFrame({'Ticker': ['AAA'], 'Rev_2026-03-31': [100.0], 'Last_Updated': ['2026-05-03 00:00:00']})
+    scores = new_data_scores(master, {'AAA': '2026-04-30'}, now='2026-05-03 12:00:00')
+
+    assert scores.iloc[0] == 0.0
+    assert expected_report_date('2026-03-31', '2026-04-30') == pd.Timestamp('2026-08-14')
+
+
+def test_calendar_date_of_next_quarter_is_used():
+    master = pd.DataFrame({'Ticker': ['AAA'], 'Rev_2026-03-31': [100.0], 'Last_Updated': ['2026-07-01 00:00:00']})
+    scores = new_data_scores(master, {'AAA': '2026-07-30'}, now='2026-08-01')
+
+    assert scores.iloc[0] == 2.5
+    assert expected_report_date('2026-03-31', '2026-07-30') == pd.Timestamp('2026-07-30')